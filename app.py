@@ -1,82 +1,285 @@
+import os
+import time
 import streamlit as st
 import pandas as pd
-import yfinance as yf
-from fredapi import Fred
 import plotly.graph_objects as go
+from datasets import treasury_codes, SERIES_SPECS
+from charts import (FigureCache, RANGE_VIEWS, SHORT_RANGE_VIEWS, add_pyramid_traces, apply_range_views,
+                    data_version, time_series_layout)
+from compact import calendars
+from engine import DERIVED, PANEL_COLUMNS, PANEL_LABELS, MacroEngine
+from loader import breaker_for
+from series_store import cache_stats as series_cache_stats
+from metrics import metrics, timed
+from transforms import NORMALIZATIONS, curve_spreads, curve_snapshot
 
 # Config
 st.set_page_config(page_title="Isaura's Macro Dashboard", layout="wide")
 st.title(" Isaura's Macro Dashboard")
 
-# Load FRED
-fred = Fred(api_key=st.secrets["fred"]["api_key"])
+# Fetching and calculations live in engine.py; the app adds Streamlit caching on top.
+# The on-disk store means reruns and cold starts read from Parquet, not the network.
+# With MACRO_READ_ONLY=1 the app only reads what refresher.py keeps up to date.
+# cache_resource rather than cache_data: every session shares the one compact, read-only copy
+# (see compact.py) instead of unpickling its own
+class BatchFailed(Exception):
+    """Some series in a batch failed; carries (data, errors) so the batch isn't cached"""
+
+    def __init__(self, data, errors):
+        super().__init__(f"{len(errors)} series failed to load")
+        self.data, self.errors = data, errors
+
+# Only complete batches are cached: Streamlit doesn't cache a call that raises, so a source that was
+# briefly down is retried on the next rerun instead of showing as failed for the rest of the hour
+@st.cache_resource(ttl=3600)
+def load_series_batch(symbols):
+    """Fetch a group of series in parallel; returns (data, errors) keyed by symbol"""
+    results, errors = engine.fetch_batch(symbols)
+    if errors:
+        raise BatchFailed(results, errors)
+    return results, errors
+
+# Series loaded so far in this run; views only load what they actually show
+data, load_errors = {}, {}
+
+def load_for_run(symbols):
+    """Engine loader: fetch only series this run hasn't loaded yet, in one parallel batch"""
+    missing = tuple(s for s in symbols if s not in data and s not in load_errors)
+    if missing:
+        try:
+            results, errors = load_series_batch(missing)
+        except BatchFailed as e:
+            results, errors = e.data, e.errors
+        data.update(results)
+        load_errors.update(errors)
+    return ({s: data[s] for s in symbols if s in data},
+            {s: load_errors[s] for s in symbols if s in load_errors})
+
+engine = MacroEngine(fred_api_key=st.secrets["fred"]["api_key"],
+                     read_only=os.environ.get("MACRO_READ_ONLY") == "1", loader=load_for_run)
+prefetch = engine.load
+get_series = engine.series
+get_close = engine.close
+
+def staleness_badge(*symbols):
+    """Flag series past their refresh interval, blaming the source only if its circuit breaker is open"""
+    for symbol in symbols:
+        age_seconds = engine.stale_for(symbol)
+        if age_seconds is not None:
+            hours = age_seconds / 3600
+            age = f"{hours / 24:.0f} days" if hours >= 48 else f"{hours:.0f} hours"
+            source = SERIES_SPECS[symbol]["source"]
+            # Otherwise (e.g. MACRO_READ_ONLY=1 with the refresher behind) we don't know why
+            if breaker_for(source).is_open:
+                source_name = {"fred": "FRED", "yahoo": "Yahoo Finance"}.get(source, source)
+                st.caption(f"⚠️ Stale data: {symbol} was last updated {age} ago because {source_name} is not responding.")
+            else:
+                st.caption(f"⚠️ Stale data: {symbol} was last updated {age} ago.")
+
+# The first guessed SRF code that has data. Codes that don't exist are negative-cached in the
+# store (see datasets.first_available), so re-resolving after the TTL costs no failed requests.
+@st.cache_data(ttl=3600)
+def resolve_srf_series():
+    return engine.srf_series()
 
 # Load CPI data for inflation calculations
-@st.cache_data
+@st.cache_data(ttl=3600)
 def load_cpi_data():
     """Load and calculate CPI inflation rate"""
     try:
-        cpi = fred.get_series("CPIAUCSL", start="1990-01-01").dropna()
-        # Calculate year-over-year inflation rate
-        cpi_inflation = cpi.pct_change(periods=12) * 100
-        return cpi_inflation.dropna()
+        return engine.cpi_inflation()
     except Exception as e:
         st.error(f"Error loading CPI data: {e}")
         return pd.Series()
 
+# Load every Treasury maturity into one date x tenor frame
+@st.cache_data(ttl=3600)
+def load_yield_curve():
+    """Load all maturities at once; returns (nominal curve, real curve, errors by code)"""
+    return engine.yield_curve()
+
+@st.cache_data(ttl=3600)
+def load_real_prices():
+    """Deflate all REAL_PRICE_TICKERS in one vectorized pass; returns a wide frame of real prices"""
+    return engine.real_prices()
+
+# Built figures are kept in a process-wide LRU cache shared by every session
+@st.cache_resource
+def get_figure_cache():
+    return FigureCache()
+
+def cached_figure(key, series, build):
+    """Return the figure for key, rebuilding it only when its data or display settings change"""
+    full_key = (key, data_version(*series))
+    
+    def timed_build():
+        with timed("figure", ":".join(key) if isinstance(key, tuple) else key):
+            return build()
+    
+    return get_figure_cache().get_or_build(full_key, timed_build)
+
+def show_chart(fig):
+    """st.plotly_chart, timed per view (this is where the figure gets serialized), with its payload size"""
+    # Sized outside the timing: a figure the cache doesn't hold has to be serialized once more for it
+    nbytes = get_figure_cache().size_of(fig)
+    with timed("chart", view, nbytes=nbytes):
+        st.plotly_chart(fig, use_container_width=True)
+
+# Function to create an ETF price chart with real (inflation-adjusted) price overlay
+def create_etf_chart(ticker):
+    prices = get_close(ticker)
+    if prices.empty:
+        return None
+    
+    # Real price (inflation-adjusted), computed for all tickers at once in load_real_prices
+    real_price = pd.Series(dtype=float)
+    try:
+        real_prices = load_real_prices()
+        if ticker in real_prices.columns:
+            real_price = real_prices[ticker].dropna()
+    except Exception as e:
+        st.warning(f"Could not calculate real {ticker} returns: {e}")
+    
+    def build():
+        fig = go.Figure()
+        
+        # Nominal price
+        add_pyramid_traces(fig, prices,
+            mode='lines', 
+            name=f"{ticker} (Nominal)",
+            line=dict(color='blue'),
+            hovertemplate='<b>%{fullData.name}</b><br>' +
+                          'Date: %{x|%Y-%m-%d}<br>' +
+                          'Price: $%{y:.2f}<br>' +
+                          '<extra></extra>'
+        )
+        
+        if not real_price.empty:
+            add_pyramid_traces(fig, real_price,
+                mode='lines',
+                name=f"{ticker} (Real, Inflation-Adjusted)",
+                line=dict(color='red', dash='dash'),
+                hovertemplate='<b>%{fullData.name}</b><br>' +
+                              'Date: %{x|%Y-%m-%d}<br>' +
+                              'Real Price: $%{y:.2f}<br>' +
+                              '<extra></extra>'
+            )
+        
+        fig.update_layout(**time_series_layout("Price (USD)"))
+        apply_range_views(fig)
+        return fig
+    
+    return cached_figure(("etf", ticker), [prices, real_price], build)
+
+# Function to create a single-line time series chart (UUP, Fed facilities, VIX)
+def create_line_chart(key, series, name, value_hover, yaxis_title, color=None, views=RANGE_VIEWS, hlines=()):
+    def build():
+        fig = go.Figure()
+        add_pyramid_traces(fig, series, views,
+            mode='lines',
+            name=name,
+            line=dict(color=color),
+            hovertemplate='<b>%{fullData.name}</b><br>' +
+                          'Date: %{x|%Y-%m-%d}<br>' +
+                          value_hover + '<br>' +
+                          '<extra></extra>'
+        )
+        for hline in hlines:
+            fig.add_hline(**hline)
+        fig.update_layout(**time_series_layout(yaxis_title, legend=False))
+        apply_range_views(fig, views)
+        return fig
+    
+    return cached_figure(key, [series], build)
+
+# Rolling analytics, updated incrementally in the engine as new bars arrive (see rolling.py)
+@st.cache_data(ttl=3600)
+def load_analytics(name):
+    return engine.analytics(name)
+
+@st.cache_data(ttl=3600)
+def load_correlations(name):
+    return engine.correlations(name)
+
+# Realized vol, drawdown and percentile rank metrics plus drawdown and correlation charts for an ETF
+def show_risk_analytics(ticker):
+    try:
+        stats = load_analytics(ticker)
+        latest = stats.iloc[-1]
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Realized Volatility (1M, annualized)", f"{latest['vol']:.1f}%")
+        col2.metric("Drawdown from Peak", f"{latest['drawdown']:.1f}%")
+        col3.metric("Price Percentile (1Y)", f"{latest['pct_rank']:.0f}",
+                    help="Share of the last 252 closes at or below today's")
+        
+        fig_dd = create_line_chart(("drawdown", ticker), stats["drawdown"].dropna(), f"{ticker} Drawdown",
+                                   'Drawdown: %{y:.1f}%', "Drawdown (%)", color='firebrick')
+        show_chart(fig_dd)
+        
+        correlations = load_correlations(ticker)
+        
+        def build():
+            fig = go.Figure()
+            for other in correlations.columns:
+                add_pyramid_traces(fig, correlations[other],
+                    mode='lines',
+                    name=f"vs {other}",
+                    hovertemplate='<b>%{fullData.name}</b><br>' +
+                                  'Date: %{x|%Y-%m-%d}<br>' +
+                                  'Correlation: %{y:.2f}<br>' +
+                                  '<extra></extra>'
+                )
+            fig.add_hline(y=0, line_dash="dash", line_color="gray")
+            fig.update_layout(**time_series_layout("3M Rolling Correlation of Daily Changes", height=400))
+            apply_range_views(fig)
+            fig.update_yaxes(range=[-1, 1])
+            return fig
+        
+        show_chart(cached_figure(("correlations", ticker), [correlations[c] for c in correlations.columns], build))
+    except Exception as e:
+        st.warning(f"Could not calculate {ticker} risk analytics: {e}")
+
 # Tabs - Updated to include IWM
-tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["Treasury Yields", "SPY (S&P 500)", "IWM (Russell 2000)", "Dollar Index (UUP)", "Federal Reserve", "VIX"])
+# st.tabs runs every tab's body on each rerun, so use a selector and only build the chosen view
+render_start = time.perf_counter()
+view = st.radio("View", ["Treasury Yields", "SPY (S&P 500)", "IWM (Russell 2000)", "Dollar Index (UUP)", "Federal Reserve", "VIX", "Compare"],
+                horizontal=True, label_visibility="collapsed", key="view")
 
 # --- TAB 1: Treasury Yields ---
-with tab1:
+if view == "Treasury Yields":
     st.header(" Treasury Yields")
     
-    # Sub-tabs for different Treasury yields
-    subtab1, subtab2, subtab3, subtab4, subtab5, subtab6, subtab7 = st.tabs(["3M", "1Y", "3Y", "5Y", "10Y", "20Y", "30Y"])
-    
-    # Treasury yield FRED series codes
-    treasury_codes = {
-        "3M": {"code": "DGS3MO", "name": "3-Month Treasury Yield"},
-        "1Y": {"code": "DGS1", "name": "1-Year Treasury Yield"},
-        "3Y": {"code": "DGS3", "name": "3-Year Treasury Yield"},
-        "5Y": {"code": "DGS5", "name": "5-Year Treasury Yield"},
-        "10Y": {"code": "DGS10", "name": "10-Year Treasury Yield"},
-        "20Y": {"code": "DGS20", "name": "20-Year Treasury Yield"},
-        "30Y": {"code": "DGS30", "name": "30-Year Treasury Yield"}
-    }
+    # Sub-tabs for different Treasury yields, plus a whole-curve view
+    tenor = st.radio("Maturity", list(treasury_codes) + ["Curve"], horizontal=True, label_visibility="collapsed", key="tenor")
+    staleness_badge("CPIAUCSL", *(info["code"] for info in treasury_codes.values()))
     
     # Function to create treasury yield chart with real yield overlay
-    def create_treasury_chart(series_code, title):
+    def create_treasury_chart(tenor, title):
         try:
-            yield_data = fred.get_series(series_code).dropna()
-            cpi_inflation = load_cpi_data()
+            curve, real_curve, curve_errors = load_yield_curve()
+            if tenor not in curve.columns:
+                raise RuntimeError(curve_errors.get(treasury_codes[tenor]["code"], "no data returned"))
+            yield_data = curve[tenor].dropna()
+            real_yield = real_curve[tenor].dropna()
             
             if not yield_data.empty:
-                fig = go.Figure()
+                def build():
+                    fig = go.Figure()
                 
-                # Nominal yield
-                fig.add_trace(go.Scatter(
-                    x=yield_data.index, 
-                    y=yield_data.values, 
-                    mode='lines', 
-                    name=f"{title} (Nominal)",
-                    line=dict(color='blue'),
-                    hovertemplate='<b>%{fullData.name}</b><br>' +
-                                  'Date: %{x|%Y-%m-%d}<br>' +
-                                  'Yield: %{y:.2f}%<br>' +
-                                  '<extra></extra>'
-                ))
+                    # Nominal yield
+                    add_pyramid_traces(fig, yield_data,
+                        mode='lines', 
+                        name=f"{title} (Nominal)",
+                        line=dict(color='blue'),
+                        hovertemplate='<b>%{fullData.name}</b><br>' +
+                                      'Date: %{x|%Y-%m-%d}<br>' +
+                                      'Yield: %{y:.2f}%<br>' +
+                                      '<extra></extra>'
+                    )
                 
-                # Real yield (nominal - inflation)
-                if not cpi_inflation.empty:
-                    # Align dates and calculate real yield
-                    common_dates = yield_data.index.intersection(cpi_inflation.index)
-                    if len(common_dates) > 0:
-                        real_yield = yield_data.loc[common_dates] - cpi_inflation.loc[common_dates]
-                        
-                        fig.add_trace(go.Scatter(
-                            x=common_dates,
-                            y=real_yield.values,
+                    # Real yield (nominal - inflation), computed for the whole curve in load_yield_curve
+                    if not real_yield.empty:
+                        add_pyramid_traces(fig, real_yield,
                             mode='lines',
                             name=f"{title} (Real)",
                             line=dict(color='red', dash='dash'),
@@ -84,375 +287,162 @@ with tab1:
                                           'Date: %{x|%Y-%m-%d}<br>' +
                                           'Real Yield: %{y:.2f}%<br>' +
                                           '<extra></extra>'
-                        ))
+                        )
                 
-                fig.update_layout(
-                    height=500, 
-                    xaxis_title="Date", 
-                    yaxis_title="Yield (%)",
-                    xaxis=dict(
-                        rangeselector=dict(
-                            buttons=list([
-                                dict(count=1, label="1M", step="month", stepmode="backward"),
-                                dict(count=6, label="6M", step="month", stepmode="backward"),
-                                dict(count=1, label="1Y", step="year", stepmode="backward"),
-                                dict(count=5, label="5Y", step="year", stepmode="backward"),
-                                dict(step="all")
-                            ])
-                        ),
-                        rangeslider=dict(visible=True),
-                        type="date"
-                    ),
-                    hovermode='x unified',
-                    legend=dict(yanchor="top", y=0.99, xanchor="left", x=0.01)
-                )
-                return fig
+                    fig.update_layout(**time_series_layout("Yield (%)"))
+                    apply_range_views(fig)
+                    return fig
+                
+                return cached_figure(("treasury", tenor), [yield_data, real_yield], build)
             else:
                 return None
         except Exception as e:
             st.error(f"Error loading {title}: {e}")
             return None
     
-    # 3M Treasury
-    with subtab1:
-        fig = create_treasury_chart("DGS3MO", "3-Month Treasury Yield")
-        if fig:
-            st.plotly_chart(fig, use_container_width=True)
-    
-    # 1Y Treasury
-    with subtab2:
-        fig = create_treasury_chart("DGS1", "1-Year Treasury Yield")
+    if tenor != "Curve":
+        fig = create_treasury_chart(tenor, treasury_codes[tenor]["name"])
         if fig:
-            st.plotly_chart(fig, use_container_width=True)
+            show_chart(fig)
     
-    # 3Y Treasury
-    with subtab3:
-        fig = create_treasury_chart("DGS3", "3-Year Treasury Yield")
-        if fig:
-            st.plotly_chart(fig, use_container_width=True)
-    
-    # 5Y Treasury
-    with subtab4:
-        fig = create_treasury_chart("DGS5", "5-Year Treasury Yield")
-        if fig:
-            st.plotly_chart(fig, use_container_width=True)
-    
-    # 10Y Treasury
-    with subtab5:
-        fig = create_treasury_chart("DGS10", "10-Year Treasury Yield")
-        if fig:
-            st.plotly_chart(fig, use_container_width=True)
-    
-    # 20Y Treasury
-    with subtab6:
-        fig = create_treasury_chart("DGS20", "20-Year Treasury Yield")
-        if fig:
-            st.plotly_chart(fig, use_container_width=True)
-    
-    # 30Y Treasury
-    with subtab7:
-        fig = create_treasury_chart("DGS30", "30-Year Treasury Yield")
-        if fig:
-            st.plotly_chart(fig, use_container_width=True)
-
-# --- TAB 2: SPY ETF ---
-with tab2:
-    st.header(" SPY - S&P 500 ETF (Max Range)")
-    try:
-        spy = yf.download("SPY", start="2000-01-01", end=pd.Timestamp.today().strftime("%Y-%m-%d"))
-        
-        # Handle MultiIndex columns by flattening them
-        if isinstance(spy.columns, pd.MultiIndex):
-            spy.columns = spy.columns.get_level_values(0)
-        
-        if not spy.empty and "Close" in spy.columns:
-            cpi_inflation = load_cpi_data()
+    # Whole curve: snapshot on any date plus the standard spreads, all sliced from the same frame
+    else:
+        try:
+            curve, real_curve, curve_errors = load_yield_curve()
+            if curve.empty:
+                raise RuntimeError("; ".join(curve_errors.values()) or "no data returned")
             
-            fig2 = go.Figure()
+            snapshot_date = st.date_input("Curve on", value=curve.index.max().date(),
+                                          min_value=curve.index.min().date(), max_value=curve.index.max().date())
+            nominal_curve = curve_snapshot(curve, pd.Timestamp(snapshot_date))
             
-            # Nominal SPY price
-            fig2.add_trace(go.Scatter(
-                x=spy.index, 
-                y=spy["Close"], 
-                mode='lines', 
-                name="SPY (Nominal)",
+            fig_curve = go.Figure()
+            fig_curve.add_trace(go.Scatter(
+                x=nominal_curve.index,
+                y=nominal_curve.values,
+                mode='lines+markers',
+                name=f"Nominal ({nominal_curve.name:%Y-%m-%d})",
                 line=dict(color='blue'),
-                hovertemplate='<b>%{fullData.name}</b><br>' +
-                              'Date: %{x|%Y-%m-%d}<br>' +
-                              'Price: $%{y:.2f}<br>' +
-                              '<extra></extra>'
+                hovertemplate='<b>%{x}</b><br>Yield: %{y:.2f}%<extra></extra>'
             ))
-            
-            # Real SPY returns (inflation-adjusted)
+            cpi_inflation = load_cpi_data()
             if not cpi_inflation.empty:
-                try:
-                    # Calculate daily returns for SPY
-                    spy_daily_returns = spy["Close"].pct_change().fillna(0)
-                    
-                    # Get CPI inflation rate (already calculated as YoY % change)
-                    # Convert to daily inflation rate
-                    cpi_daily_inflation = cpi_inflation.reindex(spy.index, method='ffill').fillna(0) / 365.25 / 100
-                    
-                    # Calculate real daily returns: (1 + nominal_return) / (1 + inflation_rate) - 1
-                    real_daily_returns = (1 + spy_daily_returns) / (1 + cpi_daily_inflation) - 1
-                    
-                    # Start with initial SPY price and compound with real returns
-                    initial_price = spy["Close"].iloc[0]
-                    real_spy_price = pd.Series(index=spy.index, dtype=float)
-                    real_spy_price.iloc[0] = initial_price
-                    
-                    # Calculate cumulative real price by compounding real returns
-                    cumulative_real_multiplier = (1 + real_daily_returns).cumprod()
-                    real_spy_price = initial_price * cumulative_real_multiplier
-                    
-                    # Remove NaN values
-                    real_spy_price = real_spy_price.dropna()
-                    
-                    fig2.add_trace(go.Scatter(
-                        x=real_spy_price.index,
-                        y=real_spy_price.values,
+                real_curve_on_date = nominal_curve - cpi_inflation.asof(nominal_curve.name)
+                fig_curve.add_trace(go.Scatter(
+                    x=real_curve_on_date.index,
+                    y=real_curve_on_date.values,
+                    mode='lines+markers',
+                    name="Real",
+                    line=dict(color='red', dash='dash'),
+                    hovertemplate='<b>%{x}</b><br>Real Yield: %{y:.2f}%<extra></extra>'
+                ))
+            fig_curve.update_layout(height=400, xaxis_title="Maturity", yaxis_title="Yield (%)",
+                                    hovermode='x unified', legend=dict(yanchor="top", y=0.99, xanchor="left", x=0.01))
+            show_chart(fig_curve)
+            
+            spreads = curve_spreads(curve)
+            
+            def build_spreads():
+                fig_spreads = go.Figure()
+                for label in spreads.columns:
+                    add_pyramid_traces(fig_spreads, spreads[label],
                         mode='lines',
-                        name="SPY (Real, Inflation-Adjusted)",
-                        line=dict(color='red', dash='dash'),
+                        name=label,
                         hovertemplate='<b>%{fullData.name}</b><br>' +
                                       'Date: %{x|%Y-%m-%d}<br>' +
-                                      'Real Price: $%{y:.2f}<br>' +
+                                      'Spread: %{y:.2f}%<br>' +
                                       '<extra></extra>'
-                    ))
-                except Exception as e:
-                    st.warning(f"Could not calculate real SPY returns: {e}")
+                    )
+                fig_spreads.add_hline(y=0, line_dash="dash", line_color="gray")
+                fig_spreads.update_layout(**time_series_layout("Spread (percentage points)"))
+                apply_range_views(fig_spreads)
+                return fig_spreads
             
-            fig2.update_layout(
-                height=500, 
-                xaxis_title="Date", 
-                yaxis_title="Price (USD)",
-                xaxis=dict(
-                    rangeselector=dict(
-                        buttons=list([
-                            dict(count=1, label="1M", step="month", stepmode="backward"),
-                            dict(count=6, label="6M", step="month", stepmode="backward"),
-                            dict(count=1, label="1Y", step="year", stepmode="backward"),
-                            dict(count=5, label="5Y", step="year", stepmode="backward"),
-                            dict(step="all")
-                        ])
-                    ),
-                    rangeslider=dict(visible=True),
-                    type="date"
-                ),
-                hovermode='x unified',
-                legend=dict(yanchor="top", y=0.99, xanchor="left", x=0.01)
-            )
-            st.plotly_chart(fig2, use_container_width=True)
+            fig_spreads = cached_figure("spreads", [spreads], build_spreads)
+            show_chart(fig_spreads)
+            
+            st.info("💡 **Curve Spreads**: A negative 2s10s or 3m10y spread means the curve is inverted (short rates above long rates), which has historically preceded recessions.")
+        except Exception as e:
+            st.error(f"Error loading yield curve: {e}")
+
+# --- TAB 2: SPY ETF ---
+elif view == "SPY (S&P 500)":
+    st.header(" SPY - S&P 500 ETF (Max Range)")
+    prefetch("CPIAUCSL", "market")
+    staleness_badge("CPIAUCSL", "market")
+    try:
+        fig2 = create_etf_chart("SPY")
+        
+        if fig2:
+            show_chart(fig2)
             
             # Add some explanation text
-            st.info("💡 **Real vs Nominal SPY**: The real price shows SPY's true purchasing power growth using the formula: Real Return = (1 + Nominal Return) ÷ (1 + Inflation Rate) - 1. This shows what your investment gains were after accounting for inflation.")
+            st.info("💡 **Real vs Nominal SPY**: The real price is SPY's price divided by the CPI level on each day (interpolated between monthly prints), in dollars of its first date, so both lines start at the same price. The gap between them is what inflation took out of your investment gains.")
+            
+            show_risk_analytics("SPY")
             
         else:
             st.warning("⚠️ SPY data not available — please check ticker or date range.")
-            st.write("Available columns:", spy.columns.tolist() if not spy.empty else "No data")
     except Exception as e:
         st.error(f"Error downloading SPY data: {e}")
 
 # --- TAB 3: IWM ETF (Russell 2000) ---
-with tab3:
+elif view == "IWM (Russell 2000)":
     st.header(" IWM - Russell 2000 ETF (Max Range)")
+    prefetch("CPIAUCSL", "market")
+    staleness_badge("CPIAUCSL", "market")
     try:
-        iwm = yf.download("IWM", start="2000-01-01", end=pd.Timestamp.today().strftime("%Y-%m-%d"))
-        
-        # Handle MultiIndex columns by flattening them
-        if isinstance(iwm.columns, pd.MultiIndex):
-            iwm.columns = iwm.columns.get_level_values(0)
+        fig3 = create_etf_chart("IWM")
         
-        if not iwm.empty and "Close" in iwm.columns:
-            cpi_inflation = load_cpi_data()
-            
-            fig3 = go.Figure()
-            
-            # Nominal IWM price
-            fig3.add_trace(go.Scatter(
-                x=iwm.index, 
-                y=iwm["Close"], 
-                mode='lines', 
-                name="IWM (Nominal)",
-                line=dict(color='blue'),
-                hovertemplate='<b>%{fullData.name}</b><br>' +
-                              'Date: %{x|%Y-%m-%d}<br>' +
-                              'Price: $%{y:.2f}<br>' +
-                              '<extra></extra>'
-            ))
-            
-            # Real IWM returns (inflation-adjusted)
-            if not cpi_inflation.empty:
-                try:
-                    # Calculate daily returns for IWM
-                    iwm_daily_returns = iwm["Close"].pct_change().fillna(0)
-                    
-                    # Get CPI inflation rate (already calculated as YoY % change)
-                    # Convert to daily inflation rate
-                    cpi_daily_inflation = cpi_inflation.reindex(iwm.index, method='ffill').fillna(0) / 365.25 / 100
-                    
-                    # Calculate real daily returns: (1 + nominal_return) / (1 + inflation_rate) - 1
-                    real_daily_returns = (1 + iwm_daily_returns) / (1 + cpi_daily_inflation) - 1
-                    
-                    # Start with initial IWM price and compound with real returns
-                    initial_price = iwm["Close"].iloc[0]
-                    real_iwm_price = pd.Series(index=iwm.index, dtype=float)
-                    real_iwm_price.iloc[0] = initial_price
-                    
-                    # Calculate cumulative real price by compounding real returns
-                    cumulative_real_multiplier = (1 + real_daily_returns).cumprod()
-                    real_iwm_price = initial_price * cumulative_real_multiplier
-                    
-                    # Remove NaN values
-                    real_iwm_price = real_iwm_price.dropna()
-                    
-                    fig3.add_trace(go.Scatter(
-                        x=real_iwm_price.index,
-                        y=real_iwm_price.values,
-                        mode='lines',
-                        name="IWM (Real, Inflation-Adjusted)",
-                        line=dict(color='red', dash='dash'),
-                        hovertemplate='<b>%{fullData.name}</b><br>' +
-                                      'Date: %{x|%Y-%m-%d}<br>' +
-                                      'Real Price: $%{y:.2f}<br>' +
-                                      '<extra></extra>'
-                    ))
-                except Exception as e:
-                    st.warning(f"Could not calculate real IWM returns: {e}")
-            
-            fig3.update_layout(
-                height=500, 
-                xaxis_title="Date", 
-                yaxis_title="Price (USD)",
-                xaxis=dict(
-                    rangeselector=dict(
-                        buttons=list([
-                            dict(count=1, label="1M", step="month", stepmode="backward"),
-                            dict(count=6, label="6M", step="month", stepmode="backward"),
-                            dict(count=1, label="1Y", step="year", stepmode="backward"),
-                            dict(count=5, label="5Y", step="year", stepmode="backward"),
-                            dict(step="all")
-                        ])
-                    ),
-                    rangeslider=dict(visible=True),
-                    type="date"
-                ),
-                hovermode='x unified',
-                legend=dict(yanchor="top", y=0.99, xanchor="left", x=0.01)
-            )
-            st.plotly_chart(fig3, use_container_width=True)
+        if fig3:
+            show_chart(fig3)
             
             # Add some explanation text
             st.info("💡 **Real vs Nominal IWM**: The real price shows IWM's true purchasing power growth after accounting for inflation. This is particularly important for small-cap stocks as they can be more sensitive to economic cycles and inflation.")
             
+            show_risk_analytics("IWM")
+            
         else:
             st.warning("⚠️ IWM data not available — please check ticker or date range.")
-            st.write("Available columns:", iwm.columns.tolist() if not iwm.empty else "No data")
     except Exception as e:
         st.error(f"Error downloading IWM data: {e}")
 
 # --- TAB 4: UUP ETF (DXY Proxy) ---
-with tab4:
+elif view == "Dollar Index (UUP)":
     st.header(" Dollar Index (UUP ETF)")
     try:
-        uup = yf.download(
-            "UUP",
-            start="2008-01-01",
-            end=pd.Timestamp.today().strftime("%Y-%m-%d")
-        )
+        uup = get_close("UUP")
+        staleness_badge("market")
         
-        # Handle MultiIndex columns by flattening them
-        if isinstance(uup.columns, pd.MultiIndex):
-            uup.columns = uup.columns.get_level_values(0)
-        
-        if not uup.empty and "Close" in uup.columns:
-            fig4 = go.Figure()
-            fig4.add_trace(go.Scatter(
-                x=uup.index, 
-                y=uup["Close"], 
-                mode='lines', 
-                name="UUP Close",
-                hovertemplate='<b>UUP Close</b><br>' +
-                              'Date: %{x|%Y-%m-%d}<br>' +
-                              'Price: $%{y:.2f}<br>' +
-                              '<extra></extra>'
-            ))
-            fig4.update_layout(
-                height=500, 
-                xaxis_title="Date", 
-                yaxis_title="Price (USD)",
-                xaxis=dict(
-                    rangeselector=dict(
-                        buttons=list([
-                            dict(count=1, label="1M", step="month", stepmode="backward"),
-                            dict(count=6, label="6M", step="month", stepmode="backward"),
-                            dict(count=1, label="1Y", step="year", stepmode="backward"),
-                            dict(count=5, label="5Y", step="year", stepmode="backward"),
-                            dict(step="all")
-                        ])
-                    ),
-                    rangeslider=dict(visible=True),
-                    type="date"
-                ),
-                hovermode='x unified'
-            )
-            st.plotly_chart(fig4, use_container_width=True)
+        if not uup.empty:
+            fig4 = create_line_chart("uup", uup, "UUP Close", 'Price: $%{y:.2f}', "Price (USD)")
+            show_chart(fig4)
         else:
             st.warning("⚠️ UUP data not available — please check ticker or date range.")
-            st.write("Available columns:", uup.columns.tolist() if not uup.empty else "No data")
     except Exception as e:
         st.error(f"Error downloading UUP data: {e}")
 
 # --- TAB 5: Federal Reserve Data ---
-with tab5:
+elif view == "Federal Reserve":
     st.header("Federal Reserve Data")
     
     # Sub-tabs for different Fed data
-    fed_subtab1, fed_subtab2, fed_subtab3 = st.tabs(["Temporary Repo Operations", "Standing Repo Facility", "Reverse Repo Facility"])
+    fed_view = st.radio("Facility", ["Temporary Repo Operations", "Standing Repo Facility", "Reverse Repo Facility"],
+                        horizontal=True, label_visibility="collapsed", key="fed_view")
     
     # Temporary Open Market Operations Repo (RPONTSYD)
-    with fed_subtab1:
+    if fed_view == "Temporary Repo Operations":
         st.subheader("Temporary Open Market Operations - Repo Facility")
         try:
             # FRED series code for temporary repo operations (banks borrowing from Fed)
-            repo_data = fred.get_series("RPONTSYD", start="2000-01-01").dropna()
+            repo_data = get_series("RPONTSYD").dropna()
+            staleness_badge("RPONTSYD")
             
             if not repo_data.empty:
-                fig_repo = go.Figure()
-                
-                fig_repo.add_trace(go.Scatter(
-                    x=repo_data.index,
-                    y=repo_data.values,
-                    mode='lines',
-                    name="Temporary Repo Operations",
-                    line=dict(color='darkblue'),
-                    hovertemplate='<b>Temporary Repo Operations</b><br>' +
-                                  'Date: %{x|%Y-%m-%d}<br>' +
-                                  'Amount: $%{y:,.0f} billions<br>' +
-                                  '<extra></extra>'
-                ))
+                fig_repo = create_line_chart("repo", repo_data, "Temporary Repo Operations",
+                                             'Amount: $%{y:,.0f} billions', "Amount (Billions USD)", color='darkblue')
                 
-                fig_repo.update_layout(
-                    height=500,
-                    xaxis_title="Date",
-                    yaxis_title="Amount (Billions USD)",
-                    xaxis=dict(
-                        rangeselector=dict(
-                            buttons=list([
-                                dict(count=1, label="1M", step="month", stepmode="backward"),
-                                dict(count=6, label="6M", step="month", stepmode="backward"),
-                                dict(count=1, label="1Y", step="year", stepmode="backward"),
-                                dict(count=5, label="5Y", step="year", stepmode="backward"),
-                                dict(step="all")
-                            ])
-                        ),
-                        rangeslider=dict(visible=True),
-                        type="date"
-                    ),
-                    hovermode='x unified'
-                )
-                
-                st.plotly_chart(fig_repo, use_container_width=True)
+                show_chart(fig_repo)
                 
                 # Add explanation
                 st.info("💡 **Temporary Open Market Operations**: This shows Treasury securities purchased by the Fed in temporary open market operations. These were used extensively during QE periods (2008-2014, 2020-2021) to provide liquidity to the banking system. This is different from the Standing Repo Facility introduced in 2021.")
@@ -473,60 +463,21 @@ with tab5:
             st.error(f"Error loading temporary repo data: {e}")
     
     # Standing Repo Facility (SRF) - Introduced July 2021
-    with fed_subtab2:
+    elif fed_view == "Standing Repo Facility":
         st.subheader("Standing Repo Facility (SRF)")
         try:
-            # Try to get SRF data - this might not be available in FRED yet
+            # SRF data might not be available in FRED yet, so resolve which guessed code works
             # You might need to find the correct series code or use alternative data source
-            
-            # For now, let's try a few potential series codes
-            srf_series_codes = ["SRFUTILIZATION", "SRFAMOUNT", "RPONTSYSRF"]  # These are guesses
-            srf_data = None
-            
-            for code in srf_series_codes:
-                try:
-                    srf_data = fred.get_series(code, start="2021-07-01").dropna()
-                    if not srf_data.empty:
-                        break
-                except:
-                    continue
+            srf_code, srf_data = resolve_srf_series()
+            if srf_code:
+                staleness_badge(srf_code)
             
             if srf_data is not None and not srf_data.empty:
-                fig_srf = go.Figure()
-                
-                fig_srf.add_trace(go.Scatter(
-                    x=srf_data.index,
-                    y=srf_data.values,
-                    mode='lines',
-                    name="Standing Repo Facility",
-                    line=dict(color='green'),
-                    hovertemplate='<b>Standing Repo Facility</b><br>' +
-                                  'Date: %{x|%Y-%m-%d}<br>' +
-                                  'Amount: $%{y:,.0f} billions<br>' +
-                                  '<extra></extra>'
-                ))
-                
-                fig_srf.update_layout(
-                    height=500,
-                    xaxis_title="Date",
-                    yaxis_title="Amount (Billions USD)",
-                    xaxis=dict(
-                        rangeselector=dict(
-                            buttons=list([
-                                dict(count=1, label="1M", step="month", stepmode="backward"),
-                                dict(count=6, label="6M", step="month", stepmode="backward"),
-                                dict(count=1, label="1Y", step="year", stepmode="backward"),
-                                dict(count=2, label="2Y", step="year", stepmode="backward"),
-                                dict(step="all")
-                            ])
-                        ),
-                        rangeslider=dict(visible=True),
-                        type="date"
-                    ),
-                    hovermode='x unified'
-                )
+                fig_srf = create_line_chart("srf", srf_data, "Standing Repo Facility",
+                                            'Amount: $%{y:,.0f} billions', "Amount (Billions USD)",
+                                            color='green', views=SHORT_RANGE_VIEWS)
                 
-                st.plotly_chart(fig_srf, use_container_width=True)
+                show_chart(fig_srf)
                 
                 # Add explanation
                 st.info("💡 **Standing Repo Facility (SRF)**: Introduced in July 2021, this facility serves as a backstop in money markets. Banks can borrow against Treasury and agency securities at a rate set by the FOMC. Higher usage indicates funding stress in short-term markets.")
@@ -567,48 +518,18 @@ with tab5:
             """)
     
     # Reverse Repo Facility (RRPONTSYD)
-    with fed_subtab3:
+    elif fed_view == "Reverse Repo Facility":
         st.subheader("Overnight Reverse Repurchase Agreement Facility")
         try:
             # FRED series code for reverse repo facility
-            reverse_repo_data = fred.get_series("RRPONTSYD", start="2013-01-01").dropna()
+            reverse_repo_data = get_series("RRPONTSYD").dropna()
+            staleness_badge("RRPONTSYD")
             
             if not reverse_repo_data.empty:
-                fig_reverse_repo = go.Figure()
+                fig_reverse_repo = create_line_chart("reverse_repo", reverse_repo_data, "Reverse Repo Facility",
+                                                     'Amount: $%{y:,.0f} billions', "Amount (Billions USD)", color='darkgreen')
                 
-                fig_reverse_repo.add_trace(go.Scatter(
-                    x=reverse_repo_data.index,
-                    y=reverse_repo_data.values,
-                    mode='lines',
-                    name="Reverse Repo Facility",
-                    line=dict(color='darkgreen'),
-                    hovertemplate='<b>Reverse Repo Facility</b><br>' +
-                                  'Date: %{x|%Y-%m-%d}<br>' +
-                                  'Amount: $%{y:,.0f} billions<br>' +
-                                  '<extra></extra>'
-                ))
-                
-                fig_reverse_repo.update_layout(
-                    height=500,
-                    xaxis_title="Date",
-                    yaxis_title="Amount (Billions USD)",
-                    xaxis=dict(
-                        rangeselector=dict(
-                            buttons=list([
-                                dict(count=1, label="1M", step="month", stepmode="backward"),
-                                dict(count=6, label="6M", step="month", stepmode="backward"),
-                                dict(count=1, label="1Y", step="year", stepmode="backward"),
-                                dict(count=5, label="5Y", step="year", stepmode="backward"),
-                                dict(step="all")
-                            ])
-                        ),
-                        rangeslider=dict(visible=True),
-                        type="date"
-                    ),
-                    hovermode='x unified'
-                )
-                
-                st.plotly_chart(fig_reverse_repo, use_container_width=True)
+                show_chart(fig_reverse_repo)
                 
                 # Add explanation
                 st.info("💡 **Reverse Repo Facility**: This shows daily usage where institutions park cash WITH the Fed overnight. Higher usage indicates excess liquidity in the financial system, as institutions have more cash than profitable investment opportunities.")
@@ -629,77 +550,107 @@ with tab5:
             st.error(f"Error loading Reverse Repo data: {e}")
 
 # --- TAB 6: VIX Index ---
-with tab6:
+elif view == "VIX":
     st.header("VIX - Volatility Index")
     try:
         # Download VIX data using yfinance
-        vix = yf.download("^VIX", start="2000-01-01", end=pd.Timestamp.today().strftime("%Y-%m-%d"))
-        
-        # Handle MultiIndex columns by flattening them
-        if isinstance(vix.columns, pd.MultiIndex):
-            vix.columns = vix.columns.get_level_values(0)
+        vix = get_close("^VIX")
+        staleness_badge("market")
         
-        if not vix.empty and "Close" in vix.columns:
-            fig_vix = go.Figure()
-            
-            # VIX close price
-            fig_vix.add_trace(go.Scatter(
-                x=vix.index,
-                y=vix["Close"],
-                mode='lines',
-                name="VIX Close",
-                line=dict(color='orange'),
-                hovertemplate='<b>VIX Close</b><br>' +
-                              'Date: %{x|%Y-%m-%d}<br>' +
-                              'VIX: %{y:.2f}<br>' +
-                              '<extra></extra>'
-            ))
-            
-            # Add horizontal lines for key VIX levels
-            fig_vix.add_hline(y=20, line_dash="dash", line_color="red", 
-                             annotation_text="High Volatility (20)", annotation_position="bottom right")
-            fig_vix.add_hline(y=30, line_dash="dash", line_color="darkred", 
-                             annotation_text="Very High Volatility (30)", annotation_position="bottom right")
-            
-            fig_vix.update_layout(
-                height=500,
-                xaxis_title="Date",
-                yaxis_title="VIX Level",
-                xaxis=dict(
-                    rangeselector=dict(
-                        buttons=list([
-                            dict(count=1, label="1M", step="month", stepmode="backward"),
-                            dict(count=6, label="6M", step="month", stepmode="backward"),
-                            dict(count=1, label="1Y", step="year", stepmode="backward"),
-                            dict(count=5, label="5Y", step="year", stepmode="backward"),
-                            dict(step="all")
-                        ])
-                    ),
-                    rangeslider=dict(visible=True),
-                    type="date"
-                ),
-                hovermode='x unified'
-            )
+        if not vix.empty:
+            # VIX close price with horizontal lines for key VIX levels
+            fig_vix = create_line_chart("vix", vix, "VIX Close", 'VIX: %{y:.2f}', "VIX Level", color='orange', hlines=[
+                dict(y=20, line_dash="dash", line_color="red",
+                     annotation_text="High Volatility (20)", annotation_position="bottom right"),
+                dict(y=30, line_dash="dash", line_color="darkred",
+                     annotation_text="Very High Volatility (30)", annotation_position="bottom right"),
+            ])
             
-            st.plotly_chart(fig_vix, use_container_width=True)
+            show_chart(fig_vix)
             
             # Add explanation
             st.info("💡 **VIX Interpretation**: VIX below 20 = Low volatility/complacency, 20-30 = Elevated volatility, Above 30 = High fear/uncertainty. The VIX is often called the 'fear index' as it spikes during market stress.")
             
             # Add current VIX level info
-            current_vix = vix["Close"].iloc[-1]
-            if current_vix < 20:
-                vix_interpretation = "🟢 Low Volatility"
-            elif current_vix < 30:
-                vix_interpretation = "🟡 Elevated Volatility"
-            else:
-                vix_interpretation = "🔴 High Volatility"
+            current_vix = vix.iloc[-1]
+            # Regime per VIX_REGIME_BOUNDS, maintained incrementally by the engine
+            vix_interpretation = ["🟢 Low Volatility", "🟡 Elevated Volatility", "🔴 High Volatility"][
+                int(engine.vix_regime().iloc[-1])]
             
-            st.metric(label="Latest VIX Level", value=f"{current_vix:.2f}", help=vix_interpretation)
+            col1, col2, col3 = st.columns(3)
+            col1.metric(label="Latest VIX Level", value=f"{current_vix:.2f}", help=vix_interpretation)
+            try:
+                vix_stats = load_analytics("^VIX").iloc[-1]
+                col2.metric("1Y Percentile Rank", f"{vix_stats['pct_rank']:.0f}",
+                            help="Share of the last 252 closes at or below today's")
+                col3.metric("1Y Z-Score", f"{vix_stats['zscore']:+.2f}",
+                            help="Standard deviations above (+) or below (-) the 1-year average")
+            except Exception as e:
+                st.warning(f"Could not calculate VIX analytics: {e}")
             
         else:
             st.warning("⚠️ VIX data not available — please check ticker or date range.")
-            st.write("Available columns:", vix.columns.tolist() if not vix.empty else "No data")
             
     except Exception as e:
-        st.error(f"Error downloading VIX data: {e}")
\ No newline at end of file
+        st.error(f"Error downloading VIX data: {e}")
+
+# --- TAB 7: Compare any series on one chart ---
+elif view == "Compare":
+    st.header("Compare Series")
+    chosen = st.multiselect("Series", PANEL_COLUMNS, default=["DGS10_REAL", "SPY_REAL"],
+                            format_func=PANEL_LABELS.get, key="compare_series")
+    compare_modes = {"level": "Levels", "rebase": "Rebased (start = 100)", "change": "Change since start", "zscore": "Z-score"}
+    col1, col2 = st.columns([3, 1])
+    mode = col1.radio("Scale", NORMALIZATIONS, format_func=compare_modes.get, horizontal=True, key="compare_mode",
+                      help="Rebasing and changes are measured from each series' first value on or after the start date")
+    start = col2.date_input("From", value=pd.Timestamp("2020-01-01"), key="compare_start")
+    
+    if chosen:
+        try:
+            # Columns come out of one pre-aligned panel; slower series are carried forward between releases
+            compared = engine.compare(chosen, start=start, mode=mode)
+            if mode == "rebase":
+                # Columns that have data but start at zero have nothing to rebase on
+                blank = [c for c in chosen if compared[c].isna().all()]
+                if blank:
+                    levels = engine.compare(blank, start=start, mode="level")
+                    unbased = [PANEL_LABELS[c] for c in blank if levels[c].notna().any()]
+                    if unbased:
+                        st.warning(f"Can't rebase {', '.join(unbased)}: the first value on or after the start date is zero.")
+            
+            def build():
+                fig = go.Figure()
+                for column in chosen:
+                    add_pyramid_traces(fig, compared[column].dropna(),
+                        mode='lines',
+                        name=PANEL_LABELS[column],
+                        hovertemplate='<b>%{fullData.name}</b><br>' +
+                                      'Date: %{x|%Y-%m-%d}<br>' +
+                                      'Value: %{y:.2f}<br>' +
+                                      '<extra></extra>'
+                    )
+                fig.update_layout(**time_series_layout(compare_modes[mode]))
+                apply_range_views(fig)
+                return fig
+            
+            show_chart(cached_figure(("compare", mode, str(start), *chosen), [compared], build))
+        except Exception as e:
+            st.error(f"Error comparing series: {e}")
+    else:
+        st.info("Pick one or more series to compare.")
+
+# --- Diagnostics: per-view render time, per-fetch/transform/figure timings ---
+metrics.record("render", view, time.perf_counter() - render_start)
+metrics.write_prometheus()
+
+# Hidden unless the page is opened with ?diagnostics=1
+if st.query_params.get("diagnostics") == "1":
+    with st.sidebar.expander("Diagnostics", expanded=True):
+        st.dataframe(pd.DataFrame(metrics.summary()), hide_index=True,
+                     column_config={"p50_ms": st.column_config.NumberColumn(format="%.1f"),
+                                    "p95_ms": st.column_config.NumberColumn(format="%.1f"),
+                                    "total_s": st.column_config.NumberColumn(format="%.2f")})
+        st.write("Figure cache:", get_figure_cache().stats())
+        st.write("Series cache:", {**series_cache_stats(), **calendars.stats()})
+        st.write("Derived series:", DERIVED.stats())
+        st.download_button("Prometheus metrics", metrics.prometheus_text(), file_name="macro_metrics.prom", mime="text/plain")
@@ -0,0 +1,114 @@
+"""Recorded FRED/Yahoo responses for offline benchmarks.
+
+Record real responses once (needs a FRED key and network access):
+
+    python -m bench.fixtures record
+
+or write deterministic synthetic stand-ins with the same shapes, so the
+benchmarks can run anywhere (e.g. CI):
+
+    python -m bench.fixtures synthetic
+
+Fixtures are Parquet files under bench/fixtures/, one per FRED code plus one
+for the raw batched Yahoo download.
+"""
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import datasets
+
+FIXTURE_DIR = Path(__file__).parent / "fixtures"
+MARKET_FIXTURE = "yahoo__market.parquet"
+
+
+def fred_fixture_path(code):
+    return FIXTURE_DIR / f"fred__{code}.parquet"
+
+
+def fred_codes():
+    """Every FRED code the dashboard asks for"""
+    return [spec["symbol"] for spec in datasets.SERIES_SPECS.values() if spec["source"] == "fred"]
+
+
+def record(api_key):
+    """Download every series the dashboard uses, full history, into FIXTURE_DIR"""
+    import yfinance as yf
+    from fred_client import FredClient
+
+    FIXTURE_DIR.mkdir(exist_ok=True)
+    fred = FredClient(api_key)
+    for code in fred_codes():
+        try:
+            series = fred.get_series(code)
+        except ValueError as e:
+            # Guessed codes (e.g. the SRF ones) may not exist; replay will answer the same way
+            print(f"skipping {code}: {e}")
+            continue
+        series.to_frame("value").to_parquet(fred_fixture_path(code))
+        print(f"recorded {code}: {len(series)} rows")
+
+    tickers = datasets.MARKET_SPEC["tickers"]
+    market = yf.download(tickers, start=datasets.MARKET_SPEC["start"], end=pd.Timestamp.today().strftime("%Y-%m-%d"))
+    market.to_parquet(FIXTURE_DIR / MARKET_FIXTURE)
+    print(f"recorded {'+'.join(tickers)}: {len(market)} rows")
+
+
+def synthetic(end="2025-12-31", seed=0):
+    """Write random-walk fixtures with the real series' start dates and frequencies"""
+    FIXTURE_DIR.mkdir(exist_ok=True)
+    rng = np.random.default_rng(seed)
+    starts = {"CPIAUCSL": "1947-01-01", "DGS1": "1962-01-02", "DGS10": "1962-01-02", "DGS3": "1962-01-02",
+              "DGS5": "1962-01-02", "DGS20": "1962-01-02", "DGS30": "1977-02-15", "DGS2": "1976-06-01",
+              "DGS3MO": "1981-09-01", "RPONTSYD": "2003-01-02", "RRPONTSYD": "2013-09-23", "RPONTSYSRF": "2021-07-01"}
+    for code, start in starts.items():
+        if code == "CPIAUCSL":
+            index = pd.date_range(start, end, freq="MS")
+            values = 22.0 * np.exp(np.cumsum(rng.normal(0.003, 0.003, len(index))))
+        else:
+            index = pd.bdate_range(start, end)
+            values = np.abs(5 + np.cumsum(rng.normal(0, 0.05, len(index))))
+        pd.Series(values, index=index).to_frame("value").to_parquet(fred_fixture_path(code))
+
+    tickers = datasets.MARKET_SPEC["tickers"]
+    index = pd.bdate_range(datasets.MARKET_SPEC["start"], end, name="Date")
+    fields = ["Close", "High", "Low", "Open", "Volume"]
+    columns = pd.MultiIndex.from_product([fields, tickers], names=["Price", "Ticker"])
+    prices = 100 * np.exp(np.cumsum(rng.normal(0.0002, 0.01, (len(index), len(tickers))), axis=0))
+    market = pd.DataFrame(np.tile(prices, len(fields)), index=index, columns=columns)
+    market.to_parquet(FIXTURE_DIR / MARKET_FIXTURE)
+    print(f"wrote synthetic fixtures to {FIXTURE_DIR}")
+
+
+def load_fred(code):
+    """A recorded FRED series, or None if there is no fixture for the code"""
+    path = fred_fixture_path(code)
+    if not path.exists():
+        return None
+    return pd.read_parquet(path)["value"]
+
+
+def load_market():
+    """The recorded raw batched Yahoo download"""
+    return pd.read_parquet(FIXTURE_DIR / MARKET_FIXTURE)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record or synthesize benchmark fixtures")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record", help="record real FRED/Yahoo responses")
+    rec.add_argument("--api-key", help="FRED API key (default: FRED_API_KEY or .streamlit/secrets.toml)")
+    sub.add_parser("synthetic", help="write deterministic synthetic fixtures")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        from refresher import load_api_key
+        record(args.api_key or load_api_key())
+    else:
+        synthetic()
+
+
+if __name__ == "__main__":
+    main()
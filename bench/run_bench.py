@@ -0,0 +1,192 @@
+"""Offline benchmarks for the dashboard, replaying recorded FRED/Yahoo fixtures.
+
+    python -m bench.fixtures synthetic          # or `record`, once
+    python -m bench.run_bench                   # saves bench/results/<commit>.json
+    python -m bench.run_bench --compare bench/results/<other commit>.json
+
+Measures full-page script execution (cold store, warm rerun), each view on
+its own, and the core transforms at 1x, 10x and 100x history length.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# The store location is read when series_store is imported, so set it first
+STORE_DIR = Path(os.environ.setdefault("MACRO_STORE_DIR", tempfile.mkdtemp(prefix="macro-bench-")))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from bench import fixtures, stand_ins  # noqa: E402
+import datasets  # noqa: E402
+from charts import build_pyramid  # noqa: E402
+from rolling import SeriesAnalytics  # noqa: E402
+from transforms import CpiDeflator, build_yield_curve, real_yields  # noqa: E402
+
+VIEWS = ["Treasury Yields", "SPY (S&P 500)", "IWM (Russell 2000)", "Dollar Index (UUP)", "Federal Reserve", "VIX",
+         "Compare"]
+
+
+def timeit(fn, repeat):
+    """Run fn() `repeat` times; return min/median seconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {"min": min(samples), "median": statistics.median(samples), "runs": repeat}
+
+
+def scale_history(obj, factor):
+    """Same date span with `factor` times as many rows (each row repeated), for scaling tests"""
+    if factor == 1:
+        return obj
+    index = pd.date_range(obj.index[0], obj.index[-1], periods=len(obj) * factor)
+    values = np.repeat(obj.to_numpy(), factor, axis=0)
+    if isinstance(obj, pd.Series):
+        return pd.Series(values, index=index, name=obj.name)
+    return pd.DataFrame(values, index=index, columns=obj.columns)
+
+
+def bench_transforms(scales, repeat):
+    results = {}
+    cpi = fixtures.load_fred("CPIAUCSL")
+    cpi_inflation = (cpi.pct_change(periods=12) * 100).dropna()
+    tenors = {tenor: fixtures.load_fred(info["code"]) for tenor, info in datasets.treasury_codes.items()}
+    tenors = {tenor: s for tenor, s in tenors.items() if s is not None}
+    market = fixtures.load_market()["Close"]
+
+    for factor in scales:
+        scaled_tenors = {tenor: scale_history(s, factor) for tenor, s in tenors.items()}
+        prices = scale_history(market[["SPY", "IWM"]], factor)
+        results[f"transform.real_yields.x{factor}"] = timeit(
+            lambda: real_yields(build_yield_curve(scaled_tenors), cpi_inflation), repeat)
+        results[f"transform.real_prices.x{factor}"] = timeit(
+            lambda: CpiDeflator(cpi).deflate(prices), repeat)
+        results[f"transform.pyramid.x{factor}"] = timeit(
+            lambda: build_pyramid(scaled_tenors["10Y"]), repeat)
+
+        # Rolling analytics: a full pass vs. bringing warm state up to date with one new bar
+        spy = prices["SPY"].dropna()
+        results[f"transform.analytics_full.x{factor}"] = timeit(lambda: SeriesAnalytics().extend(spy), repeat)
+        warm = SeriesAnalytics()
+
+        def append_one():
+            warm.extend(spy.iloc[:-1])
+            warm.extend(spy)
+        warm.extend(spy)
+        results[f"transform.analytics_append.x{factor}"] = timeit(append_one, repeat)
+    return results
+
+
+def _clear_caches():
+    import streamlit as st
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+
+def _run_app(view=None):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(REPO / "app.py"), default_timeout=600)
+    at.secrets["fred"] = {"api_key": "replay"}
+    if view:
+        at.session_state["view"] = view
+    at.run()
+    if at.exception:
+        raise RuntimeError(f"app raised: {at.exception[0].value}")
+    return at
+
+
+def bench_app(repeat):
+    results = {}
+
+    def cold_page():
+        shutil.rmtree(STORE_DIR, ignore_errors=True)
+        STORE_DIR.mkdir(parents=True)
+        _clear_caches()
+        _run_app()
+
+    results["page.cold"] = timeit(cold_page, repeat)
+
+    at = _run_app()
+    results["page.warm_rerun"] = timeit(at.run, repeat)
+
+    # Each view on its own: store on disk is warm, in-memory caches are not
+    for view in VIEWS:
+        def one_view():
+            _clear_caches()
+            _run_app(view)
+        results[f"view.{view}"] = timeit(one_view, repeat)
+    return results
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current, baseline_path):
+    baseline = json.loads(Path(baseline_path).read_text())["results"]
+    print(f"\n{'benchmark':40} {'base ms':>10} {'now ms':>10} {'change':>8}")
+    for name, result in current.items():
+        if name not in baseline:
+            continue
+        base, now = baseline[name]["median"] * 1000, result["median"] * 1000
+        change = (now - base) / base * 100 if base else float("nan")
+        print(f"{name:40} {base:10.1f} {now:10.1f} {change:+7.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline dashboard benchmarks")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per benchmark (default 5)")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100], help="history multipliers for transforms")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated seconds per FRED/Yahoo call")
+    parser.add_argument("--skip-app", action="store_true", help="only run the transform benchmarks")
+    parser.add_argument("--compare", help="results JSON from another commit to compare against")
+    args = parser.parse_args(argv)
+
+    if not (fixtures.FIXTURE_DIR / fixtures.MARKET_FIXTURE).exists():
+        sys.exit("No fixtures found: run `python -m bench.fixtures record` (or `synthetic`) first")
+
+    stand_ins.install(latency=args.latency)
+    os.chdir(REPO)
+
+    results = bench_transforms(args.scales, args.repeat)
+    if not args.skip_app:
+        results.update(bench_app(args.repeat))
+
+    for name, result in results.items():
+        print(f"{name:40} median {result['median'] * 1000:9.1f} ms   min {result['min'] * 1000:9.1f} ms")
+
+    commit = current_commit()
+    RESULTS_DIR.mkdir(exist_ok=True)
+    out = RESULTS_DIR / f"{commit}.json"
+    out.write_text(json.dumps({
+        "commit": commit,
+        "timestamp": pd.Timestamp.now().isoformat(),
+        "python": sys.version.split()[0],
+        "latency": args.latency,
+        "results": results,
+    }, indent=2))
+    print(f"\nsaved {out}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
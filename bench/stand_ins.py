@@ -0,0 +1,198 @@
+"""Local stand-ins for the FRED API and yfinance.download that replay recorded fixtures.
+
+install() serves FRED from a local HTTP server and patches yfinance in-process,
+so app.py, datasets.py and the refresher run unmodified against the fixtures
+instead of FRED and Yahoo.
+"""
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import pandas as pd
+
+from bench import fixtures
+
+# Simulated network round-trip per call (seconds); set by install()
+_latency = 0.0
+_cache = {}
+_cache_lock = threading.Lock()
+calls = []
+
+
+def _cached(key, load):
+    # Keep fixtures in memory so the benchmarks time the app, not fixture reads
+    with _cache_lock:
+        if key not in _cache:
+            _cache[key] = load()
+        return _cache[key]
+
+
+def _observations(series_id, params):
+    """FRED's JSON for series/observations from the fixtures, or None for an unknown code"""
+    series = _cached(("fred", series_id), lambda: fixtures.load_fred(series_id))
+    if series is None:
+        return None
+    rows = series.loc[params.get("observation_start"):params.get("observation_end")]
+    offset = int(params.get("offset", 0))
+    page = rows.iloc[offset:offset + int(params.get("limit", 100000))]
+    today = pd.Timestamp.today().strftime("%Y-%m-%d")
+    return {
+        "count": len(rows), "offset": offset, "limit": int(params.get("limit", 100000)),
+        "observations": [
+            {"realtime_start": params.get("realtime_start", today), "realtime_end": params.get("realtime_end", today),
+             "date": date.strftime("%Y-%m-%d"),
+             "value": "." if pd.isna(value) else repr(float(value))}
+            for date, value in page.items()
+        ],
+    }
+
+
+class _FredHandler(BaseHTTPRequestHandler):
+    # Keep-alive, like the real API, so connection reuse can be measured
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = dict(parse_qsl(url.query))
+        server = self.server
+        calls.append(("fred", params.get("series_id")))
+        time.sleep(_latency)
+
+        if server.max_per_minute is not None:
+            now = time.monotonic()
+            with server.lock:
+                while server.recent and now - server.recent[0] >= server.window:
+                    server.recent.popleft()
+                retry_after = server.window - (now - server.recent[0]) if len(server.recent) >= server.max_per_minute else 0
+                if not retry_after:
+                    server.recent.append(now)
+            if retry_after:
+                server.rejected += 1
+                return self._reply(429, {"error_code": 429, "error_message": "Too Many Requests."},
+                                   {"Retry-After": str(math.ceil(retry_after))})
+
+        if url.path.rstrip("/") != "/fred/series/observations" or "api_key" not in params:
+            return self._reply(400, {"error_code": 400, "error_message": "Bad Request.  Variable api_key is not set."})
+        body = _observations(params.get("series_id"), params)
+        if body is None:
+            # Same answer FRED gives for an unknown code
+            return self._reply(400, {"error_code": 400, "error_message": "Bad Request.  The series does not exist."})
+        self._reply(200, body)
+
+    def _reply(self, status, body, headers=()):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in dict(headers).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class FredServer(ThreadingHTTPServer):
+    """Local HTTP stand-in for the FRED API's series/observations endpoint, answering from bench/fixtures.
+
+    max_per_minute makes it answer 429 like FRED does once a client goes over
+    the rate limit (window shortens the "minute" to keep tests quick). Point a client at it with FredClient(base_url=server.url).
+    """
+
+    daemon_threads = True
+
+    def __init__(self, max_per_minute=None, window=60, port=0):
+        super().__init__(("127.0.0.1", port), _FredHandler)
+        self.max_per_minute = max_per_minute
+        self.window = window
+        self.recent = deque()
+        self.rejected = 0
+        self.lock = threading.Lock()
+        self.url = f"http://127.0.0.1:{self.server_address[1]}/fred"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def replay_download(tickers, start=None, end=None, **kwargs):
+    """Drop-in for yfinance.download over the recorded batched download"""
+    calls.append(("yahoo", tickers))
+    time.sleep(_latency)
+    tickers = tickers.split() if isinstance(tickers, str) else list(tickers)
+    market = _cached(("yahoo", "market"), fixtures.load_market)
+    # yfinance treats end as exclusive
+    rows = market.loc[start:]
+    if end is not None:
+        rows = rows[rows.index < pd.Timestamp(end)]
+    return rows.loc[:, rows.columns.get_level_values(1).isin(tickers)].copy()
+
+
+_server = None
+
+
+def install(latency=0.0, rate_limit=100_000):
+    """Point the FRED client and yfinance at the fixtures for the rest of the process.
+
+    FRED requests go over HTTP to a local FredServer, so the real client
+    (sessions, rate limiting, parsing) is exercised. rate_limit replaces
+    FRED's 120/minute so repeated benchmark runs aren't throttled.
+    """
+    global _latency, _server
+    import yfinance
+
+    import fred_client
+
+    _latency = latency
+    if _server is None:
+        _server = FredServer().start()
+    os.environ["MACRO_FRED_API_URL"] = _server.url
+    fred_client.RATE_LIMIT = rate_limit
+    fred_client._buckets.clear()
+    yfinance.download = replay_download
+
+
+class FakeRedis:
+    """In-process stand-in for the bits of redis.Redis that store_backends.RedisBackend uses"""
+
+    def __init__(self):
+        self._data = {}
+        self._expires = {}
+        self._lock = threading.Lock()
+
+    def _expire(self, key):
+        if key in self._expires and time.monotonic() >= self._expires[key]:
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+
+    def get(self, key):
+        with self._lock:
+            self._expire(key)
+            return self._data.get(key)
+
+    def set(self, key, value, nx=False, px=None):
+        if isinstance(value, str):
+            value = value.encode()
+        with self._lock:
+            self._expire(key)
+            if nx and key in self._data:
+                return None
+            self._data[key] = value
+            self._expires.pop(key, None)
+            if px is not None:
+                self._expires[key] = time.monotonic() + px / 1000
+            return True
+
+    def delete(self, *keys):
+        with self._lock:
+            removed = 0
+            for key in keys:
+                removed += self._data.pop(key, None) is not None
+                self._expires.pop(key, None)
+            return removed
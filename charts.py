@@ -0,0 +1,196 @@
+"""Shared Plotly layout pieces, resolution pyramids and a process-wide cache of built figures."""
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from compact import data_version  # noqa: F401 (re-exported for the app)
+
+# Range buttons on every time-series chart: (label, lookback, pyramid level shown).
+# Switching happens in the browser: each level is already in the figure, and a
+# button only flips trace visibility and the x range, so there's no rerun.
+RANGE_VIEWS = [
+    ("1M", pd.DateOffset(months=1), "daily"),
+    ("6M", pd.DateOffset(months=6), "daily"),
+    ("1Y", pd.DateOffset(years=1), "daily"),
+    ("5Y", pd.DateOffset(years=5), "weekly"),
+    ("All", None, "monthly"),
+]
+
+# Shorter history (e.g. the Standing Repo Facility, since 2021) gets a 2Y button instead of 5Y
+SHORT_RANGE_VIEWS = RANGE_VIEWS[:3] + [
+    ("2Y", pd.DateOffset(years=2), "weekly"),
+    ("All", None, "monthly"),
+]
+
+PYRAMID_LEVELS = ["daily", "weekly", "monthly"]
+
+PYRAMID_CACHE_SIZE = 256
+FIGURE_CACHE_MB = int(os.environ.get("MACRO_FIGURE_CACHE_MB", 64))
+
+
+def time_series_layout(yaxis_title, legend=True, height=500):
+    """Layout for a date-axis chart with a range slider (add the range buttons with apply_range_views)"""
+    layout = dict(
+        height=height,
+        xaxis_title="Date",
+        yaxis_title=yaxis_title,
+        xaxis=dict(
+            rangeslider=dict(visible=True),
+            type="date"
+        ),
+        hovermode='x unified'
+    )
+    if legend:
+        layout["legend"] = dict(yanchor="top", y=0.99, xanchor="left", x=0.01)
+    return layout
+
+
+def _bucket_ids(index, level):
+    """Calendar bucket number of each date: Saturday-to-Friday weeks or calendar months"""
+    days = np.asarray(index, dtype="datetime64[D]")
+    if level == "weekly":
+        # 1970-01-03, day 2 of the epoch, was a Saturday
+        return (days.astype(np.int64) - 2) // 7
+    return days.astype("datetime64[M]").astype(np.int64)
+
+
+def _minmax_buckets(series, level):
+    """Lowest and highest observation of each calendar bucket (at their own dates), plus the last one"""
+    if series.empty:
+        return series
+    buckets = _bucket_ids(series.index, level)
+    # Sorted by (bucket, value), each bucket's first row is its minimum and its last row its maximum
+    order = np.lexsort((series.to_numpy(), buckets))
+    starts = np.flatnonzero(np.r_[True, np.diff(buckets[order]) != 0])
+    ends = np.r_[starts[1:] - 1, len(order) - 1]
+    keep = np.union1d(np.union1d(order[starts], order[ends]), [len(series) - 1])
+    return series.iloc[keep]
+
+
+class _PyramidCache:
+    """Small LRU of resolution pyramids, keyed by data_version of the series"""
+
+    def __init__(self, size=PYRAMID_CACHE_SIZE):
+        self.size = size
+        self._pyramids = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, series):
+        key = data_version(series)
+        with self._lock:
+            if key in self._pyramids:
+                self._pyramids.move_to_end(key)
+                return self._pyramids[key]
+        pyramid = build_pyramid(series)
+        with self._lock:
+            self._pyramids[key] = pyramid
+            while len(self._pyramids) > self.size:
+                self._pyramids.popitem(last=False)
+        return pyramid
+
+
+def build_pyramid(series):
+    """The series at every PYRAMID_LEVELS resolution, coarse levels keeping each bucket's extremes"""
+    series = series.dropna()
+    return {level: series if level == "daily" else _minmax_buckets(series, level) for level in PYRAMID_LEVELS}
+
+
+_pyramids = _PyramidCache()
+
+
+def add_pyramid_traces(fig, series, views=RANGE_VIEWS, **scatter):
+    """Add a line as one trace per pyramid level the views use, each cut to the longest lookback that shows it.
+
+    Long ranges get a few hundred points per line and short ranges full daily
+    detail; apply_range_views then shows whichever level the active button needs.
+    """
+    pyramid = _pyramids.get(series)
+    for level in dict.fromkeys(level for _, _, level in views):
+        shown = pyramid[level]
+        lookbacks = [lookback for _, lookback, view_level in views if view_level == level]
+        if len(shown) and None not in lookbacks:
+            end = shown.index[-1]
+            shown = shown.loc[min(end - lookback for lookback in lookbacks):]
+        fig.add_trace(go.Scatter(x=shown.index, y=shown.values, meta=level, **scatter))
+
+
+def apply_range_views(fig, views=RANGE_VIEWS, active=-1):
+    """Range buttons that switch both the x range and the visible pyramid level, client-side"""
+    levels = [trace.meta for trace in fig.data]
+    # Traces without a level (not added by add_pyramid_traces) are always shown
+    def visible(level):
+        return [trace_level is None or trace_level == level for trace_level in levels]
+
+    ends = [trace.x[-1] for trace in fig.data if trace.x is not None and len(trace.x)]
+    end = pd.Timestamp(max(ends)) if ends else pd.Timestamp.today()
+    buttons = []
+    for label, lookback, level in views:
+        if lookback is None:
+            relayout = {"xaxis.autorange": True}
+        else:
+            relayout = {"xaxis.range": [str((end - lookback).date()), str(end.date())]}
+        buttons.append(dict(label=label, method="update", args=[{"visible": visible(level)}, relayout]))
+
+    label, lookback, level = views[active]
+    for trace, show in zip(fig.data, visible(level)):
+        trace.visible = show
+    if lookback is not None:
+        fig.update_xaxes(range=[str((end - lookback).date()), str(end.date())])
+    fig.update_layout(updatemenus=[dict(
+        type="buttons", direction="right", buttons=buttons, active=active % len(views), showactive=True,
+        x=0, xanchor="left", y=1.02, yanchor="bottom", pad=dict(t=0, b=0),
+    )])
+    return fig
+
+
+class FigureCache:
+    """LRU cache of built figures, bounded by the size of their serialized JSON"""
+
+    def __init__(self, max_bytes=FIGURE_CACHE_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._figures = OrderedDict()   # key -> (figure, size in bytes)
+        self._sizes = {}                # id(figure) -> size in bytes, for cached figures
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key, build):
+        """Return the cached figure for key, or build(), cache and return it"""
+        with self._lock:
+            if key in self._figures:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return self._figures[key][0]
+            self.misses += 1
+
+        fig = build()
+        if fig is None:
+            return None
+
+        size = len(fig.to_json())
+        with self._lock:
+            if key not in self._figures and size <= self.max_bytes:
+                self._figures[key] = (fig, size)
+                self._sizes[id(fig)] = size
+                self._bytes += size
+                # Evict least recently used figures until we're back under budget
+                while self._bytes > self.max_bytes:
+                    _, (evicted, evicted_size) = self._figures.popitem(last=False)
+                    self._sizes.pop(id(evicted), None)
+                    self._bytes -= evicted_size
+        return fig
+
+    def size_of(self, fig):
+        """Serialized size of a figure (bytes), from the cache if it's in there"""
+        with self._lock:
+            size = self._sizes.get(id(fig))
+        return size if size is not None else len(fig.to_json())
+
+    def stats(self):
+        with self._lock:
+            return {"figures": len(self._figures), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,101 @@
+"""Compact, shared in-memory representation of cached series.
+
+Frames kept in the long-lived cache are converted once on load:
+
+- values are stored as float32 when every value, rounded to the decimals
+  the sources publish (FRED: 2-4, Yahoo: cents), comes out the same after a
+  float32 round trip, float64 otherwise (e.g. millions with decimals);
+- date indexes are interned, so every series on the same calendar (all the
+  DGS* tenors, say) points at one DatetimeIndex, and a series whose dates are
+  a contiguous stretch of an existing calendar gets a view into it;
+- value arrays are marked read-only, so one copy can be handed to every
+  session and view without defensive copies (writing to one raises instead of
+  silently corrupting everyone else's data; .copy() first if you must).
+"""
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+# Most decimals any source publishes; float32 has to preserve values to this many
+PUBLISHED_DECIMALS = 4
+
+
+class CalendarRegistry:
+    """Deduplicates DatetimeIndexes across series"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calendars = weakref.WeakValueDictionary()   # (len, first, last) -> index
+
+    def intern(self, index):
+        """Return a shared index equal to `index` (it becomes the shared one if it's new)"""
+        if not isinstance(index, pd.DatetimeIndex) or len(index) == 0:
+            return index
+        dates = index.asi8
+        key = (len(index), int(dates[0]), int(dates[-1]))
+        with self._lock:
+            shared = self._calendars.get(key)
+            if shared is not None and shared.dtype == index.dtype and np.array_equal(shared.asi8, dates):
+                return shared
+            # A contiguous stretch of a longer calendar shares its memory as a slice
+            for calendar in list(self._calendars.values()):
+                if calendar.dtype != index.dtype or len(calendar) <= len(index):
+                    continue
+                start = calendar.searchsorted(index[0])
+                stop = start + len(index)
+                if stop <= len(calendar) and np.array_equal(calendar.asi8[start:stop], dates):
+                    return calendar[start:stop]
+            self._calendars[key] = index
+            return index
+
+    def stats(self):
+        with self._lock:
+            calendars = list(self._calendars.values())
+        return {"calendars": len(calendars), "calendar_bytes": sum(c.nbytes for c in calendars)}
+
+
+calendars = CalendarRegistry()
+
+
+def _value_dtype(values):
+    """float32 if every value survives the round trip at PUBLISHED_DECIMALS, else float64"""
+    finite = values[np.isfinite(values)]
+    if finite.size == 0:
+        return np.float32
+    if np.abs(finite).max() > np.finfo(np.float32).max:
+        return np.float64
+    as32 = finite.astype(np.float32).astype(np.float64)
+    same = np.round(as32, PUBLISHED_DECIMALS) == np.round(finite, PUBLISHED_DECIMALS)
+    return np.float32 if same.all() else np.float64
+
+
+def compact(obj):
+    """Compact, read-only copy of a float Series or DataFrame (see module docstring)"""
+    if obj is None or not isinstance(obj, (pd.Series, pd.DataFrame)):
+        return obj
+    index = calendars.intern(obj.index)
+    values = obj.to_numpy(dtype=np.float64)
+    values = np.array(values, dtype=_value_dtype(values), order="C")
+    values.flags.writeable = False
+    if isinstance(obj, pd.Series):
+        return pd.Series(values, index=index, name=obj.name, copy=False)
+    return pd.DataFrame(values, index=index, columns=obj.columns, copy=False)
+
+
+def data_version(*series):
+    """Fingerprint of one or more series (for keying caches of anything derived from them).
+
+    Hashes every row, not just the tail: a CPI revision changes real prices
+    and yields in the middle of their history (see SeriesStore vintages).
+    About 0.5 ms per 10k rows.
+    """
+    parts = []
+    for s in series:
+        if s is None or len(s) == 0:
+            parts.append(0)
+            continue
+        columns = tuple(s.columns) if isinstance(s, pd.DataFrame) else s.name
+        parts.append((len(s), columns, int(pd.util.hash_pandas_object(s, index=True).sum())))
+    return tuple(parts)
@@ -0,0 +1,168 @@
+"""Catalogue of every series the dashboard uses, and how to fetch each one.
+
+Shared by the Streamlit app and the background refresher (refresher.py), so
+both read and write the same entries in the series store.
+"""
+import os
+
+import pandas as pd
+
+from loader import SeriesNotFoundError, SingleFlight, breaker_for
+from metrics import frame_bytes, timed
+
+# How long a series code that FRED says doesn't exist is skipped without asking again (seconds)
+MISSING_SERIES_TTL = int(os.environ.get("MACRO_MISSING_SERIES_TTL", 6 * 60 * 60))
+
+# Real-time window for a series' full vintage history. ALFRED's vintages start in
+# the 1990s; FRED's own earliest date (1776-07-04) doesn't fit in datetime64[ns].
+REALTIME_START = "1900-01-01"
+REALTIME_END = "9999-12-31"
+
+# Process-wide, so concurrent Streamlit sessions asking for the same series share one fetch
+_inflight = SingleFlight()
+
+# Treasury yield FRED series codes
+treasury_codes = {
+    "3M": {"code": "DGS3MO", "name": "3-Month Treasury Yield"},
+    "1Y": {"code": "DGS1", "name": "1-Year Treasury Yield"},
+    "2Y": {"code": "DGS2", "name": "2-Year Treasury Yield"},
+    "3Y": {"code": "DGS3", "name": "3-Year Treasury Yield"},
+    "5Y": {"code": "DGS5", "name": "5-Year Treasury Yield"},
+    "10Y": {"code": "DGS10", "name": "10-Year Treasury Yield"},
+    "20Y": {"code": "DGS20", "name": "20-Year Treasury Yield"},
+    "30Y": {"code": "DGS30", "name": "30-Year Treasury Yield"}
+}
+
+# Standing Repo Facility data might not be available in FRED yet, so try a few potential series codes
+srf_series_codes = ["SRFUTILIZATION", "SRFAMOUNT", "RPONTSYSRF"]  # These are guesses
+
+# Yahoo tickers, pulled together in one batched download, and the date each tab starts from
+market_tickers = {
+    "SPY": "2000-01-01",
+    "IWM": "2000-01-01",
+    "UUP": "2008-01-01",
+    "^VIX": "2000-01-01"
+}
+
+# Every series the dashboard can show, keyed by symbol
+# CPI keeps every vintage, so a revised print only touches the dates it changed (see SeriesStore.get_or_fetch_vintages)
+CPI_SPEC = {"source": "fred", "symbol": "CPIAUCSL", "start": "1990-01-01", "frequency": "monthly", "vintages": True}
+MARKET_SPEC = {"source": "yahoo", "symbol": "market", "tickers": list(market_tickers), "start": min(market_tickers.values())}
+SERIES_SPECS = {spec["symbol"]: spec for spec in (
+    [CPI_SPEC, MARKET_SPEC]
+    + [{"source": "fred", "symbol": t["code"]} for t in treasury_codes.values()]
+    + [
+        {"source": "fred", "symbol": "RPONTSYD", "start": "2000-01-01"},
+        {"source": "fred", "symbol": "RRPONTSYD", "start": "2013-01-01"},
+    ]
+    # Guessed codes usually don't exist, so don't retry them
+    + [{"source": "fred", "symbol": code, "start": "2021-07-01", "retries": 0} for code in srf_series_codes]
+)}
+
+
+def is_missing_series_error(error):
+    """True for FRED's "series does not exist" answer, as opposed to an outage"""
+    return isinstance(error, SeriesNotFoundError) or (isinstance(error, ValueError) and "does not exist" in str(error))
+
+
+def fetch_fred_series(store, fred, code, start=None, frequency="daily", force=False):
+    """Load a FRED series through the on-disk store, fetching only new observations"""
+    def fetch(since):
+        with timed("fetch", f"fred:{code}") as sample:
+            # A missing series is a fine answer from FRED, so it doesn't count against the breaker
+            series = breaker_for("fred").call(
+                lambda: fred.get_series(code, observation_start=since or start),
+                counts_as_failure=lambda e: not is_missing_series_error(e),
+            )
+            sample["nbytes"] = frame_bytes(series)
+        return series
+    return store.get_or_fetch("fred", code, fetch, frequency=frequency, force=force)["value"]
+
+
+def fetch_fred_vintages(store, fred, code, start=None, frequency="daily", force=False):
+    """Load a FRED series and all its vintages through the store, asking only about real time since the last check"""
+    def fetch(since):
+        with timed("fetch", f"fred:{code}:vintages") as sample:
+            rows = breaker_for("fred").call(
+                lambda: fred.get_observations(code, observation_start=start, realtime_start=since or REALTIME_START,
+                                              realtime_end=REALTIME_END),
+                counts_as_failure=lambda e: not is_missing_series_error(e),
+            )
+            sample["nbytes"] = frame_bytes(rows)
+        return rows
+    return store.get_or_fetch_vintages("fred", code, fetch, frequency=frequency, force=force)["value"]
+
+
+def fetch_market_data(store, tickers, start, force=False):
+    """Load close prices for all tickers as one aligned wide frame, fetching only new bars"""
+    import yfinance as yf
+
+    def fetch(since):
+        with timed("fetch", "yahoo:" + "+".join(tickers)) as sample:
+            data = breaker_for("yahoo").call(
+                # Raw closes: adjusted ones are rescaled back through history at every dividend and split
+                lambda: yf.download(tickers, start=since or start, end=pd.Timestamp.today().strftime("%Y-%m-%d"),
+                                    auto_adjust=False)
+            )
+            sample["nbytes"] = frame_bytes(data)
+        # Batched downloads come back as (field, ticker) columns; keep one Close column per ticker
+        if isinstance(data.columns, pd.MultiIndex):
+            data = data["Close"]
+        return data.dropna(how="all")
+    # Key the stored frame by the ticker set so adding a ticker triggers a full download.
+    # check_overlap: a store written with adjusted closes gets replaced rather than spliced onto.
+    return store.get_or_fetch("yahoo", "+".join(sorted(tickers)), fetch, force=force, check_overlap=True)
+
+
+def fetch_series(store, fred, spec, force=False, reprobe=False):
+    """Fetch one SERIES_SPECS entry through the store (force=True skips the TTL check).
+
+    Codes FRED recently said don't exist are answered from the negative cache,
+    even with force=True; reprobe=True asks FRED again anyway. Either way a
+    missing code raises SeriesNotFoundError, which the loader doesn't retry.
+
+    Concurrent calls for the same (source, symbol, range) wait for the one
+    already in flight instead of issuing their own request.
+    """
+    def fetch():
+        if spec["source"] == "yahoo":
+            return fetch_market_data(store, spec["tickers"], spec["start"], force=force)
+
+        missing = store.missing_error("fred", spec["symbol"], MISSING_SERIES_TTL)
+        if missing and not reprobe:
+            raise SeriesNotFoundError(missing)
+        fetch_fred = fetch_fred_vintages if spec.get("vintages") else fetch_fred_series
+        try:
+            return fetch_fred(store, fred, spec["symbol"], spec.get("start"), spec.get("frequency", "daily"), force=force)
+        except Exception as e:
+            if is_missing_series_error(e):
+                store.mark_missing("fred", spec["symbol"], e)
+                raise SeriesNotFoundError(str(e)) from e
+            raise
+
+    key = store_key(spec) + (spec.get("start"), force, reprobe)
+    with timed("load", spec["symbol"]):
+        return _inflight.do(key, fetch)
+
+
+def first_available(store, fred, symbols):
+    """Return (symbol, series) for the first symbol with data, or (None, None).
+
+    Used to probe guessed series codes. Codes that recently turned out not to
+    exist are skipped without a request, so repeat probes cost no round trips.
+    """
+    for symbol in symbols:
+        try:
+            series = fetch_series(store, fred, SERIES_SPECS[symbol]).dropna()
+        except Exception:
+            continue
+        if not series.empty:
+            return symbol, series
+    return None, None
+
+
+def store_key(spec):
+    """The (source, symbol) the store files a spec under"""
+    if spec["source"] == "yahoo":
+        return "yahoo", "+".join(sorted(spec["tickers"]))
+    return spec["source"], spec["symbol"]
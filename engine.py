@@ -0,0 +1,411 @@
+"""Headless data/compute core behind the dashboard.
+
+Fetching, alignment and real-return calculations with no Streamlit and no
+side effects at import time: nothing touches the network or the store until a
+method is called, and requests/yfinance are only imported once a series
+actually has to be fetched. A batch job, a test or another front end can use
+it directly:
+
+    from engine import MacroEngine
+
+    engine = MacroEngine(fred_api_key="...")
+    curve, real_curve, errors = engine.yield_curve()
+    real = engine.real_prices()
+"""
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import datasets
+from compact import data_version
+from datasets import SERIES_SPECS, market_tickers, srf_series_codes, treasury_codes
+from fred_client import FredClient
+from graph import Node, SeriesGraph
+from loader import fetch_all
+from metrics import timed
+from rolling import PairCorrelation, SeriesAnalytics
+from series_store import TTL_BY_FREQUENCY, SeriesStore
+from transforms import CpiDeflator, build_yield_curve, cpi_version, ffill_within, normalize, real_yields
+
+# Tickers that get an inflation-adjusted series; adding one here is all a new ETF needs
+REAL_PRICE_TICKERS = ["SPY", "IWM"]
+
+# Columns of the aligned panel (see MacroEngine.panel): FRED codes and tickers as-is
+# ("^VIX" becomes "VIX"), CPI_YOY for YoY inflation and a _REAL suffix for
+# inflation-adjusted yields and prices
+YIELD_COLUMNS = [info["code"] for info in treasury_codes.values()]
+PANEL_COLUMNS = (
+    YIELD_COLUMNS
+    + [f"{code}_REAL" for code in YIELD_COLUMNS]
+    + ["CPIAUCSL", "CPI_YOY", "RPONTSYD", "RRPONTSYD"]
+    + [ticker.lstrip("^") for ticker in market_tickers]
+    + [f"{ticker}_REAL" for ticker in REAL_PRICE_TICKERS]
+)
+
+# Display names for the panel columns
+PANEL_LABELS = {
+    **{info["code"]: f"{tenor} Treasury" for tenor, info in treasury_codes.items()},
+    **{f"{info['code']}_REAL": f"{tenor} Treasury (real)" for tenor, info in treasury_codes.items()},
+    "CPIAUCSL": "CPI", "CPI_YOY": "CPI inflation (YoY)",
+    "RPONTSYD": "Temporary repo", "RRPONTSYD": "Reverse repo",
+    **{ticker.lstrip("^"): ticker.lstrip("^") for ticker in market_tickers},
+    **{f"{ticker}_REAL": f"{ticker} (real)" for ticker in REAL_PRICE_TICKERS},
+}
+
+
+def _column_inputs(column):
+    """Symbols (SERIES_SPECS keys) a panel column is computed from"""
+    base = column.removesuffix("_REAL")
+    symbols = ["market"] if f"^{base}" in market_tickers or base in market_tickers else [base]
+    if column != base or column.startswith("CPI"):
+        symbols.append("CPIAUCSL")
+    return [s for s in dict.fromkeys(symbols) if s in SERIES_SPECS]
+
+
+# Series with rolling analytics, and whether they're prices (log returns, drawdowns) or levels
+ANALYTICS_KINDS = {"SPY": "price", "IWM": "price", "UUP": "price", "^VIX": "level", "DGS10": "level"}
+
+# VIX closes separating the low / elevated / high volatility regimes
+VIX_REGIME_BOUNDS = [20, 30]
+
+
+# --- Derived series (see graph.py): compute(inputs, since) -> (start, output from start on) ---
+
+def _cpi_yoy(inputs, since):
+    cpi = inputs["CPIAUCSL"].dropna()
+    # Each month needs the print 12 months before it
+    first = 0 if since is None else max(cpi.index.searchsorted(since) - 12, 0)
+    inflation = (cpi.iloc[first:].pct_change(periods=12) * 100).dropna()
+    return since, inflation.loc[since:]
+
+
+def _yield_curve(inputs, since):
+    available = {tenor: inputs[info["code"]].dropna().loc[since:]
+                 for tenor, info in treasury_codes.items() if inputs[info["code"]] is not None}
+    if not available:
+        return None, pd.DataFrame()
+    return since, build_yield_curve(available)
+
+
+def _real_yields(inputs, since):
+    curve, inflation = inputs["yield_curve"], inputs["CPI_YOY"]
+    # Nominal yields are still worth showing without CPI
+    inflation = pd.Series(dtype=float) if inflation is None else inflation
+    return since, real_yields(curve.loc[since:], inflation)
+
+
+def _closes(inputs, since):
+    market = inputs["market"]
+    closes = {}
+    for ticker, start in market_tickers.items():
+        if ticker in market.columns:
+            # The same window close() gives each ticker
+            first = pd.Timestamp(start) if since is None else max(pd.Timestamp(start), since)
+            closes[ticker] = market[ticker].loc[first:].dropna()
+    return since, pd.DataFrame(closes)
+
+
+def _real_prices(inputs, since):
+    closes = inputs["closes"]
+    prices = closes[[t for t in REAL_PRICE_TICKERS if t in closes.columns]].dropna(how="all")
+    deflator = CpiDeflator(inputs["CPIAUCSL"])
+    if prices.empty or deflator.version is None:
+        return None, pd.DataFrame()
+    base_dates = deflator.base_dates(prices)
+    # Levels from the print before a revised one move too (see CpiDeflator.revision_start)
+    start = deflator.revision_start(since) if since is not None else None
+    # A revision reaching back to a base date rescales the whole history
+    if start is not None and start <= base_dates.max():
+        start = None
+    return start, deflator.deflate(prices, base_date=base_dates, since=start)
+
+
+def _vix_regime(inputs, since):
+    vix = inputs["closes"]["^VIX"].dropna().loc[since:]
+    return since, pd.Series(np.digitize(vix.to_numpy(), VIX_REGIME_BOUNDS), index=vix.index, name="regime")
+
+
+# Shared by every engine in the process, so each derived series is only ever
+# brought up to date with what changed since any session last asked for it
+DERIVED = SeriesGraph([
+    Node("CPI_YOY", ["CPIAUCSL"], _cpi_yoy),
+    Node("yield_curve", YIELD_COLUMNS, _yield_curve, optional=YIELD_COLUMNS),
+    Node("real_yields", ["yield_curve", "CPI_YOY"], _real_yields, optional=["CPI_YOY"]),
+    Node("closes", ["market"], _closes),
+    Node("real_prices", ["closes", "CPIAUCSL"], _real_prices),
+    Node("vix_regime", ["closes"], _vix_regime),
+])
+
+
+# Incremental analytics state, shared by every engine in the process so each
+# call only processes observations added (or revised) since the previous one
+_rolling = {}
+_rolling_lock = threading.Lock()
+
+
+def _rolling_state(key, make):
+    with _rolling_lock:
+        if key not in _rolling:
+            _rolling[key] = make()
+        return _rolling[key]
+
+
+# The full panel as one float64 array on one calendar, shared by every engine in
+# the process and rebuilt only when one of the series behind it is reloaded
+_aligned = {}
+_aligned_lock = threading.Lock()
+
+
+class MacroEngine:
+    """Loads series through the on-disk store and derives curves and real prices from them.
+
+    loader(symbols) -> (data, errors) replaces the default parallel fetch, e.g.
+    so a front end can put its own cache in front of the store.
+    """
+
+    def __init__(self, fred_api_key=None, store=None, fred=None, read_only=False, loader=None):
+        # Only used for series that aren't in the store yet (or are due a refresh)
+        self.fred = fred or FredClient(fred_api_key)
+        self._store = store
+        self._read_only = read_only
+        self._loader = loader or self.fetch_batch
+        self._deflator = None
+
+    @property
+    def store(self):
+        if self._store is None:
+            self._store = SeriesStore(read_only=self._read_only)
+        return self._store
+
+    # --- Loading ---
+
+    def fetch(self, spec, force=False, reprobe=False):
+        """Fetch one SERIES_SPECS entry through the store (safe to call from worker threads)"""
+        return datasets.fetch_series(self.store, self.fred, spec, force=force, reprobe=reprobe)
+
+    def fetch_batch(self, symbols, force=False, reprobe=False):
+        """Fetch series in parallel, bypassing any loader; returns (data, errors) keyed by symbol"""
+        return fetch_all([SERIES_SPECS[symbol] for symbol in symbols],
+                         lambda spec: self.fetch(spec, force=force, reprobe=reprobe))
+
+    def load(self, *symbols):
+        """Load series in one batch; returns (data, errors) keyed by symbol"""
+        return self._loader(tuple(symbols))
+
+    def series(self, symbol):
+        """One loaded series (shared and read-only, see compact.py), raising its fetch error if it failed"""
+        data, errors = self.load(symbol)
+        if symbol in errors:
+            raise RuntimeError(errors[symbol])
+        return data[symbol]
+
+    def close(self, ticker):
+        """One ticker's close prices, sliced from the batched market frame"""
+        market = self.series("market")
+        if ticker not in market.columns:
+            return pd.Series(dtype=float)
+        return market[ticker].loc[market_tickers[ticker]:].dropna()
+
+    def srf_series(self):
+        """(code, series) for the first guessed Standing Repo Facility code with data, or (None, None)"""
+        return datasets.first_available(self.store, self.fred, srf_series_codes)
+
+    def stale_for(self, symbol):
+        """Seconds since a series was last refreshed if that's past its TTL, else None"""
+        spec = SERIES_SPECS[symbol]
+        source, key = datasets.store_key(spec)
+        fetched_at = self.store.meta(source, key).get("fetched_at")
+        if fetched_at is None:
+            return None
+        age = time.time() - fetched_at
+        ttl = TTL_BY_FREQUENCY.get(spec.get("frequency", "daily"), TTL_BY_FREQUENCY["daily"])
+        return age if age >= ttl else None
+
+    # --- Derived series ---
+
+    def derived(self, name):
+        """A DERIVED series, brought up to date incrementally (shared and read-only: don't modify it)"""
+        self.load(*DERIVED.sources(name))
+        return DERIVED.value(name, self.series)
+
+    @timed("transform", "cpi_inflation")
+    def cpi_inflation(self):
+        """Year-over-year CPI inflation rate (%)"""
+        return self.derived("CPI_YOY")
+
+    def as_of(self, symbol, date):
+        """A vintage-tracked series (see datasets.CPI_SPEC) as it was published on `date`"""
+        spec = SERIES_SPECS[symbol]
+        if not spec.get("vintages"):
+            raise ValueError(f"{symbol} has no stored vintages")
+        self.load(symbol)
+        series = self.store.as_of(*datasets.store_key(spec), date)
+        if series is None:
+            raise RuntimeError(f"no vintages stored for {symbol} yet")
+        return series
+
+    @timed("transform", "yield_curve")
+    def yield_curve(self):
+        """All Treasury maturities at once; returns (nominal curve, real curve, errors by code)"""
+        _, errors = self.load(*DERIVED.sources("real_yields"))
+        curve = self.derived("yield_curve")
+        if curve.empty:
+            return pd.DataFrame(), pd.DataFrame(), errors
+        # Real yields for every tenor in one subtraction (all NaN if CPI failed to load)
+        return curve, self.derived("real_yields"), errors
+
+    def deflator(self):
+        """CpiDeflator for the current CPI release, rebuilt only when CPI changes"""
+        cpi = self.series("CPIAUCSL")
+        deflator = self._deflator
+        if deflator is None or deflator.version != cpi_version(cpi.dropna().sort_index()):
+            with timed("transform", "cpi_deflator"):
+                deflator = self._deflator = CpiDeflator(cpi)
+        return deflator
+
+    @timed("transform", "real_prices")
+    def real_prices(self, tickers=REAL_PRICE_TICKERS):
+        """Deflate every ticker's close in one vectorized pass; returns a wide frame of real prices"""
+        if set(tickers) <= set(REAL_PRICE_TICKERS):
+            real = self.derived("real_prices")
+            return real[[t for t in tickers if t in real.columns]] if not real.empty else real
+
+        self.load("CPIAUCSL", "market")
+        prices = pd.DataFrame({ticker: self.close(ticker) for ticker in tickers})
+        deflator = self.deflator()
+        if prices.empty or deflator.version is None:
+            return pd.DataFrame()
+        return deflator.deflate(prices)
+
+    def vix_regime(self):
+        """VIX regime on each date: 0 below VIX_REGIME_BOUNDS[0], 1 in between, 2 above the last bound"""
+        return self.derived("vix_regime")
+
+    def _analytics_input(self, name):
+        return self.close(name) if name in market_tickers else self.series(name).dropna()
+
+    @timed("transform", "analytics")
+    def analytics(self, name):
+        """Rolling realized vol, z-score, percentile rank and drawdown for one of ANALYTICS_KINDS"""
+        kind = ANALYTICS_KINDS[name]
+        state = _rolling_state(("series", name), lambda: SeriesAnalytics(kind))
+        return state.extend(self._analytics_input(name))
+
+    @timed("transform", "correlations")
+    def correlations(self, name, others=None):
+        """Rolling correlations of one series' daily changes with each of the others (default: all ANALYTICS_KINDS)"""
+        others = [o for o in (others or ANALYTICS_KINDS) if o != name]
+        self.load(*dict.fromkeys("market" if o in market_tickers else o for o in [name] + others))
+        series = self._analytics_input(name)
+        columns = {}
+        for other in others:
+            kinds = (ANALYTICS_KINDS[name], ANALYTICS_KINDS[other])
+            state = _rolling_state(("pair", name, other), lambda: PairCorrelation(kinds))
+            columns[other.lstrip("^")] = state.extend(series, self._analytics_input(other))
+        return pd.DataFrame(columns)
+
+    @timed("transform", "panel")
+    def panel(self, columns=None, start=None, end=None):
+        """Aligned date x column frame of raw, derived and deflated series (see PANEL_COLUMNS).
+
+        Only the series behind the requested columns are loaded, in one batch
+        (plus whatever the DERIVED nodes behind them use). Rows are the union of every column's dates within [start, end].
+        """
+        columns = list(PANEL_COLUMNS) if columns is None else list(columns)
+        unknown = [c for c in columns if c not in PANEL_COLUMNS]
+        if unknown:
+            raise ValueError(f"unknown panel columns: {', '.join(unknown)}")
+
+        # Real columns are derived from the nominal series of the same name
+        base = {column: column.removesuffix("_REAL") for column in columns}
+        yields = list(dict.fromkeys(b for b in base.values() if b in YIELD_COLUMNS))
+        real_tickers = [b for c, b in base.items() if c != b and b in REAL_PRICE_TICKERS]
+        tickers = {ticker.lstrip("^"): ticker for ticker in market_tickers}
+        symbols = [symbol for column in columns for symbol in _column_inputs(column)]
+        needs_cpi = "CPIAUCSL" in symbols
+        self.load(*dict.fromkeys(symbols))
+
+        derived = {}
+        if needs_cpi:
+            derived["CPI_YOY"] = self.cpi_inflation()
+        if yields:
+            # The DERIVED curves are by tenor; the panel names its columns by FRED code
+            codes = {tenor: info["code"] for tenor, info in treasury_codes.items()}
+            curve = self.derived("yield_curve").rename(columns=codes)
+            derived.update(curve[[code for code in yields if code in curve.columns]])
+            if needs_cpi:
+                real = self.derived("real_yields").rename(columns=codes)
+                derived.update(real[[code for code in yields if code in real.columns]].add_suffix("_REAL"))
+        if real_tickers:
+            derived.update(self.real_prices(real_tickers).add_suffix("_REAL"))
+
+        parts = {}
+        for column in columns:
+            if column in derived:
+                parts[column] = derived[column]
+            elif column in tickers:
+                parts[column] = self.close(tickers[column])
+            else:
+                parts[column] = self.series(column)
+        panel = pd.concat(parts, axis=1).sort_index().loc[start:end].dropna(how="all")
+        panel.index.name = "date"
+        return panel
+
+    def aligned_panel(self):
+        """(panel, errors): every PANEL_COLUMNS column whose inputs loaded, on one shared calendar.
+
+        Built once and cached process-wide until an input series is reloaded,
+        so picking columns out of it is positional indexing rather than a join
+        per request. The panel's values are read-only.
+        """
+        symbols = list(dict.fromkeys(s for column in PANEL_COLUMNS for s in _column_inputs(column)))
+        data, errors = self.load(*symbols)
+        version = (data_version(*(data.get(s) for s in symbols)), tuple(sorted(errors)))
+        with _aligned_lock:
+            cached = _aligned.get("panel")
+        if cached is not None and cached[0] == version:
+            return cached[1], cached[2]
+
+        columns = [c for c in PANEL_COLUMNS if not any(s in errors for s in _column_inputs(c))]
+        panel = self.panel(columns) if columns else pd.DataFrame(columns=[], index=pd.DatetimeIndex([], name="date"))
+        values = np.array(panel.to_numpy(dtype=np.float64), order="C")
+        values.flags.writeable = False
+        panel = pd.DataFrame(values, index=panel.index, columns=panel.columns, copy=False)
+        with _aligned_lock:
+            # Only the latest version is kept; sessions on an older one just rebuild
+            _aligned["panel"] = (version, panel, errors)
+        return panel, errors
+
+    @timed("transform", "compare")
+    def compare(self, columns, start=None, end=None, mode="level", fill=True):
+        """Panel columns on their shared calendar within [start, end], normalized for one chart.
+
+        fill carries slower series (monthly CPI, weekly repo) forward between
+        releases so every column has a value on every date it's current;
+        mode is one of transforms.NORMALIZATIONS, applied over the window.
+        Raises ValueError for unknown columns and RuntimeError for ones
+        whose series failed to load.
+        """
+        columns = list(columns)
+        unknown = [c for c in columns if c not in PANEL_COLUMNS]
+        if unknown:
+            raise ValueError(f"unknown panel columns: {', '.join(unknown)}")
+        panel, errors = self.aligned_panel()
+        missing = [c for c in columns if c not in panel.columns]
+        if missing:
+            failed = dict.fromkeys(s for c in missing for s in _column_inputs(c) if s in errors)
+            raise RuntimeError(f"could not load {', '.join(missing)}: "
+                               + "; ".join(f"{s}: {errors[s]}" for s in failed))
+
+        index = panel.index
+        first = 0 if start is None else index.searchsorted(pd.Timestamp(start), side="left")
+        stop = len(index) if end is None else index.searchsorted(pd.Timestamp(end), side="right")
+        values = panel.to_numpy()[first:stop, panel.columns.get_indexer(columns)]
+        if len(values):
+            if fill:
+                values = ffill_within(values)
+            values = normalize(values, mode)
+        result = pd.DataFrame(values, index=index[first:stop], columns=columns)
+        return result.dropna(how="all")
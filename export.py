@@ -0,0 +1,105 @@
+"""Export the dashboard's aligned macro panel for notebooks and batch jobs.
+
+Reads the same series store the dashboard and refresher.py use, so exporting
+doesn't hit FRED or Yahoo for anything already stored:
+
+    python export.py panel.parquet
+    python export.py panel.arrow --columns DGS10 DGS10_REAL SPY SPY_REAL --start 2020-01-01
+    python export.py panel.csv --end 2024-12-31
+    python export.py - --format arrow | consumer    # Arrow IPC stream on stdout
+
+Arrow files are written uncompressed so readers can memory-map them without
+copying, e.g. pyarrow.feather.read_table("panel.arrow", memory_map=True) or
+pyarrow.ipc.open_file(pyarrow.memory_map("panel.arrow")). The same is
+available from Python via export_panel(engine, ...). Stored series come out
+as float32 where that keeps ~7 significant digits (see compact.py); derived
+columns are float64.
+"""
+import argparse
+import sys
+
+from engine import PANEL_COLUMNS, MacroEngine
+from refresher import load_api_key
+
+FORMATS = ["parquet", "arrow", "csv"]
+SUFFIX_FORMATS = {".parquet": "parquet", ".pq": "parquet", ".arrow": "arrow", ".feather": "arrow",
+                  ".ipc": "arrow", ".csv": "csv"}
+
+
+def format_for(path):
+    """Export format implied by a file name's suffix (parquet if unknown)"""
+    for suffix, fmt in SUFFIX_FORMATS.items():
+        if str(path).lower().endswith(suffix):
+            return fmt
+    return "parquet"
+
+
+def to_arrow(panel):
+    """The panel as a pyarrow Table, with the date index as the first column"""
+    import pyarrow as pa
+    return pa.Table.from_pandas(panel.reset_index(), preserve_index=False)
+
+
+def write_panel(panel, sink, fmt):
+    """Write a panel to a path or binary file object.
+
+    Arrow goes out in the IPC file format for paths (random access, mmap-able)
+    and the IPC stream format for file objects such as stdout.
+    """
+    if fmt == "csv":
+        panel.to_csv(sink, date_format="%Y-%m-%d")
+        return
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = to_arrow(panel)
+    if fmt == "parquet":
+        pq.write_table(table, sink)
+    elif fmt == "arrow":
+        new_writer = pa.ipc.new_stream if hasattr(sink, "write") else pa.ipc.new_file
+        with new_writer(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        raise ValueError(f"unknown export format {fmt!r} (expected one of {', '.join(FORMATS)})")
+
+
+def export_panel(engine, sink, fmt=None, columns=None, start=None, end=None):
+    """Build the panel (see MacroEngine.panel) and write it to sink; returns the panel"""
+    panel = engine.panel(columns=columns, start=start, end=end)
+    write_panel(panel, sink, fmt or format_for(sink))
+    return panel
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the aligned macro panel from the series store")
+    parser.add_argument("output", help="file to write, or - for stdout")
+    parser.add_argument("--format", choices=FORMATS, help="default: from the file suffix (parquet for stdout)")
+    parser.add_argument("--columns", nargs="+", metavar="COLUMN", help=f"columns to include (default all): {' '.join(PANEL_COLUMNS)}")
+    parser.add_argument("--start", help="first date, e.g. 2020-01-01")
+    parser.add_argument("--end", help="last date")
+    parser.add_argument("--refresh", action="store_true",
+                        help="refresh stale series from FRED/Yahoo first (default: serve what's stored)")
+    args = parser.parse_args(argv)
+
+    # Stored series need no API key; it's only used for series not in the store yet (or --refresh)
+    try:
+        api_key = load_api_key()
+    except (OSError, KeyError):
+        api_key = None
+    engine = MacroEngine(fred_api_key=api_key, read_only=not args.refresh)
+
+    try:
+        if args.output == "-":
+            fmt = args.format or "parquet"
+            sink = sys.stdout if fmt == "csv" else sys.stdout.buffer
+            export_panel(engine, sink, fmt, args.columns, args.start, args.end)
+        else:
+            panel = export_panel(engine, args.output, args.format, args.columns, args.start, args.end)
+            print(f"wrote {len(panel)} rows x {len(panel.columns)} columns to {args.output}", file=sys.stderr)
+    except (ValueError, RuntimeError) as e:
+        sys.exit(f"export failed: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""FRED API client with pooled keep-alive connections and a shared rate limit.
+
+FRED allows 120 requests per minute per API key. Every FredClient in the
+process using the same key draws from one token bucket, so all Streamlit
+sessions and loader threads together stay under the limit instead of each
+pacing itself. Requests go through one requests.Session per process, whose
+connection pool keeps the HTTPS connections to FRED open between calls.
+
+get_series() mirrors fredapi's (a float Series indexed by date, NaN where
+FRED has no value) and passes observation_start/observation_end and
+realtime_start/realtime_end straight through, so refreshes only download
+observations after the last stored date. get_observations() returns FRED's
+raw rows including each value's realtime period.
+
+The API root can be overridden with MACRO_FRED_API_URL, e.g. to point the
+client at a local stand-in (see bench/stand_ins.py).
+"""
+import datetime
+import os
+import threading
+import time
+
+import pandas as pd
+
+from metrics import metrics
+
+FRED_API_URL = "https://api.stlouisfed.org/fred"
+
+# realtime_end FRED gives values that haven't been revised (yet)
+STILL_CURRENT = "9999-12-31"
+
+# Requests per minute allowed per API key
+RATE_LIMIT = int(os.environ.get("MACRO_FRED_RATE_LIMIT", 120))
+
+# Connections kept open to FRED (the loader runs at most 4 FRED fetches at once)
+POOL_SIZE = 8
+TIMEOUT = 30
+
+# FRED returns at most this many observations per request
+PAGE_LIMIT = 100000
+
+# Attempts at a request FRED answered with 429 Too Many Requests
+MAX_ATTEMPTS = 4
+
+
+class TokenBucket:
+    """Blocking, thread-safe token bucket: up to `capacity` requests at once, then `rate` per second.
+
+    acquire() reserves a token and sleeps until it's due, so callers queue in
+    the order they arrived rather than polling.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Take one token, waiting for it if necessary; returns the seconds waited"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def pause(self, seconds):
+        """Hold back every caller for `seconds` (the server said to slow down)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+
+# One bucket per API key for the life of the process. A burst of a quarter of
+# the limit, refilled at the rest of it, never exceeds RATE_LIMIT in any minute.
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def bucket_for(api_key, limit=None):
+    """The process-wide token bucket for an API key"""
+    limit = limit or RATE_LIMIT
+    with _buckets_lock:
+        if api_key not in _buckets:
+            burst = max(limit // 4, 1)
+            _buckets[api_key] = TokenBucket(rate=(limit - burst) / 60, capacity=burst)
+        return _buckets[api_key]
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def shared_session():
+    """The process-wide requests.Session (created on first use)"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def _param(value):
+    if isinstance(value, (datetime.date, pd.Timestamp)):
+        return value.strftime("%Y-%m-%d")
+    return value
+
+
+def _retry_after(response, attempt):
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return 2.0 ** attempt
+
+
+class FredClient:
+    """Minimal FRED API client (only what the dashboard needs).
+
+    session and bucket default to the process-wide ones; pass your own to
+    isolate a client, e.g. in tests.
+    """
+
+    def __init__(self, api_key=None, base_url=None, session=None, bucket=None, timeout=TIMEOUT):
+        self.api_key = api_key
+        self.base_url = (base_url or os.environ.get("MACRO_FRED_API_URL") or FRED_API_URL).rstrip("/")
+        self.timeout = timeout
+        self._session = session
+        self._bucket = bucket
+
+    @property
+    def bucket(self):
+        return self._bucket or bucket_for(self.api_key)
+
+    def request(self, endpoint, **params):
+        """GET an API endpoint (e.g. "series/observations") and return the decoded JSON.
+
+        Raises ValueError with FRED's message for requests FRED rejects (bad
+        key, unknown series, ...), like fredapi does.
+        """
+        if not self.api_key:
+            raise RuntimeError("no FRED API key configured")
+        session = self._session or shared_session()
+        params = {key: _param(value) for key, value in params.items() if value is not None}
+        params.update(api_key=self.api_key, file_type="json")
+
+        for attempt in range(MAX_ATTEMPTS):
+            waited = self.bucket.acquire()
+            if waited:
+                metrics.record("rate_limit", "fred", waited)
+            response = session.get(f"{self.base_url}/{endpoint}", params=params, timeout=self.timeout)
+            if response.status_code != 429 or attempt == MAX_ATTEMPTS - 1:
+                break
+            # Over the limit anyway (another replica on the same key?): back off everyone in this process
+            self.bucket.pause(_retry_after(response, attempt))
+
+        if 400 <= response.status_code < 500 and response.status_code != 429:
+            try:
+                message = response.json()["error_message"]
+            except (ValueError, KeyError):
+                message = response.text or response.reason
+            raise ValueError(message)
+        response.raise_for_status()
+        return response.json()
+
+    def get_observations(self, series_id, observation_start=None, observation_end=None,
+                         realtime_start=None, realtime_end=None, **params):
+        """FRED's observation rows as a frame: realtime_start, realtime_end, date, value.
+
+        Dates are Timestamps (a realtime_end of 9999-12-31, "still current",
+        becomes NaT) and missing values ("." in FRED) are NaN. Results longer
+        than one page are fetched page by page.
+        """
+        rows = []
+        while True:
+            page = self.request("series/observations", series_id=series_id,
+                                observation_start=observation_start, observation_end=observation_end,
+                                realtime_start=realtime_start, realtime_end=realtime_end,
+                                sort_order="asc", limit=PAGE_LIMIT, offset=len(rows), **params)
+            observations = page.get("observations", [])
+            rows.extend(observations)
+            if not observations or len(rows) >= int(page.get("count", len(rows))):
+                break
+
+        frame = pd.DataFrame(rows, columns=["realtime_start", "realtime_end", "date", "value"])
+        frame["realtime_end"] = frame["realtime_end"].mask(frame["realtime_end"] == STILL_CURRENT)
+        for column in ["realtime_start", "realtime_end", "date"]:
+            frame[column] = pd.to_datetime(frame[column], errors="coerce")
+        frame["value"] = pd.to_numeric(frame["value"], errors="coerce")
+        return frame
+
+    def get_series(self, series_id, observation_start=None, observation_end=None,
+                   realtime_start=None, realtime_end=None, **params):
+        """Observations as a float Series indexed by date.
+
+        With a realtime period spanning several vintages, a date's latest value
+        in that period wins.
+        """
+        frame = self.get_observations(series_id, observation_start, observation_end,
+                                      realtime_start, realtime_end, **params)
+        frame = frame.drop_duplicates("date", keep="last")
+        return pd.Series(frame["value"].to_numpy(dtype=float), index=pd.DatetimeIndex(frame["date"], name=None),
+                         name=series_id)
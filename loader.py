@@ -0,0 +1,204 @@
+"""Concurrent loader that fetches every series a page needs in one fan-out.
+
+Requests run on a bounded thread pool. Each source (FRED, Yahoo) gets its own
+limiter so we never have more than a few requests in flight against it, and
+failed fetches are retried with exponential backoff. SingleFlight lets
+concurrent sessions share one outstanding fetch for the same series.
+"""
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+MAX_WORKERS = 8
+
+# Per-source limits: max requests in flight and minimum spacing between starts
+SOURCE_LIMITS = {
+    # FRED's 120 requests/minute is enforced per API key in fred_client; this only smooths the burst
+    "fred": {"max_concurrent": 4, "min_interval": 0.05},
+    # yf.download keeps module-level state, so only one call may run at a time
+    "yahoo": {"max_concurrent": 1, "min_interval": 0.0},
+}
+
+
+class SourceLimiter:
+    """Caps concurrency and request rate for one data source"""
+
+    def __init__(self, max_concurrent=4, min_interval=0.0):
+        self._slots = threading.Semaphore(max_concurrent)
+        self._min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def __enter__(self):
+        self._slots.acquire()
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_start - now
+            self._next_start = max(now, self._next_start) + self._min_interval
+        if wait > 0:
+            time.sleep(wait)
+        return self
+
+    def __exit__(self, *exc):
+        self._slots.release()
+        return False
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one execution.
+
+    The first caller for a key runs the function; callers that arrive while it
+    is still running wait for it and get the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}   # key -> Future of the call in flight
+        self.shared = 0    # calls served by someone else's fetch
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a source whose circuit breaker is open"""
+
+
+class SeriesNotFoundError(LookupError):
+    """The source says the series doesn't exist (or said so recently); retrying won't change that"""
+
+
+class CircuitBreaker:
+    """Stops calling a source after repeated failures, then lets one call through to probe it.
+
+    After failure_threshold consecutive failures the breaker opens and every
+    call fails fast with CircuitOpenError for reset_after seconds. Then it's
+    half-open: the next call is a trial and everyone else keeps failing fast
+    until it finishes. Success closes the breaker, failure re-opens it.
+    """
+
+    def __init__(self, name, failure_threshold=3, reset_after=300):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False   # a half-open trial call is in flight
+
+    def _blocked(self):
+        return self._opened_at is not None and (
+            self._trial or time.monotonic() - self._opened_at < self.reset_after)
+
+    @property
+    def is_open(self):
+        """Whether calls fail fast right now (open, or half-open with the trial still running)"""
+        with self._lock:
+            return self._blocked()
+
+    def call(self, fn, counts_as_failure=lambda e: True):
+        """Run fn() unless the breaker is open; errors rejected by counts_as_failure don't trip it"""
+        with self._lock:
+            if self._blocked():
+                raise CircuitOpenError(f"{self.name} is unavailable (circuit open), serving cached data")
+            # Not blocked but opened: the wait is over and this call is the trial
+            trial = self._trial = self._opened_at is not None
+        # None: the call neither succeeded nor failed in a way that says anything about the source
+        succeeded = None
+        try:
+            result = fn()
+            succeeded = True
+            return result
+        except Exception as e:
+            if counts_as_failure(e):
+                succeeded = False
+            raise
+        finally:
+            with self._lock:
+                if trial:
+                    self._trial = False
+                if succeeded:
+                    self._failures = 0
+                    self._opened_at = None
+                elif succeeded is False:
+                    self._failures += 1
+                    if trial or self._failures >= self.failure_threshold:
+                        self._opened_at = time.monotonic()
+
+
+_breakers = {source: CircuitBreaker(source) for source in SOURCE_LIMITS}
+
+
+def breaker_for(source):
+    """The process-wide circuit breaker for a source"""
+    if source not in _breakers:
+        _breakers[source] = CircuitBreaker(source)
+    return _breakers[source]
+
+
+_limiters = {source: SourceLimiter(**limits) for source, limits in SOURCE_LIMITS.items()}
+
+
+def _limiter_for(source):
+    if source not in _limiters:
+        _limiters[source] = SourceLimiter()
+    return _limiters[source]
+
+
+def _fetch_with_retries(fetch, spec, retries, backoff):
+    """Run fetch(spec) under the source limiter, retrying on failure (but not on answers that can't change)"""
+    for attempt in range(retries + 1):
+        try:
+            with _limiter_for(spec["source"]):
+                return fetch(spec)
+        except (CircuitOpenError, SeriesNotFoundError):
+            raise
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * 2 ** attempt)
+
+
+def fetch_all(specs, fetch, max_workers=MAX_WORKERS, retries=2, backoff=0.5):
+    """Fetch every spec in parallel.
+
+    Each spec is a dict with at least "source" and "symbol" (and optionally
+    "retries" to override the default). Returns (results, errors), both keyed
+    by symbol; a symbol appears in exactly one of them.
+    """
+    results, errors = {}, {}
+    if not specs:
+        return results, errors
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(specs))) as pool:
+        futures = {
+            spec["symbol"]: pool.submit(_fetch_with_retries, fetch, spec, spec.get("retries", retries), backoff)
+            for spec in specs
+        }
+        for symbol, future in futures.items():
+            try:
+                results[symbol] = future.result()
+            except Exception as e:
+                errors[symbol] = str(e)
+    return results, errors
@@ -0,0 +1,128 @@
+"""Process-wide timing and byte counters for fetches, transforms and charts.
+
+Every measurement is filed under a kind ("fetch", "transform", "figure",
+"render", ...) and a name (series code, chart key, view). Recent samples are
+kept per (kind, name) so p50/p95 can be reported, and the whole registry can
+be exported in Prometheus text format. Each sample is also logged as one JSON
+line on the "macro.metrics" logger at DEBUG level.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+log = logging.getLogger("macro.metrics")
+
+# Samples kept per (kind, name) for percentiles
+WINDOW = 500
+
+# If set, the Prometheus export is rewritten here after every page render
+# (e.g. for node_exporter's textfile collector)
+METRICS_FILE = os.environ.get("MACRO_METRICS_FILE")
+
+
+class Metrics:
+    def __init__(self, window=WINDOW):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._count = defaultdict(int)
+        self._seconds = defaultdict(float)
+        self._bytes = defaultdict(int)
+
+    def record(self, kind, name, seconds, nbytes=0):
+        key = (kind, str(name))
+        with self._lock:
+            self._samples[key].append(seconds)
+            self._count[key] += 1
+            self._seconds[key] += seconds
+            self._bytes[key] += nbytes
+        log.debug(json.dumps({"kind": kind, "name": str(name), "seconds": round(seconds, 6), "bytes": nbytes}))
+
+    @contextmanager
+    def timed(self, kind, name, nbytes=0):
+        """Time the block; set `.nbytes` on the yielded dict to count bytes too"""
+        sample = {"nbytes": nbytes}
+        start = time.perf_counter()
+        try:
+            yield sample
+        finally:
+            self.record(kind, name, time.perf_counter() - start, sample["nbytes"])
+
+    def summary(self):
+        """One row per (kind, name) with count, p50, p95, total seconds and bytes"""
+        with self._lock:
+            keys = sorted(self._count)
+            rows = []
+            for key in keys:
+                samples = sorted(self._samples[key])
+                rows.append({
+                    "kind": key[0],
+                    "name": key[1],
+                    "count": self._count[key],
+                    "p50_ms": _percentile(samples, 0.5) * 1000,
+                    "p95_ms": _percentile(samples, 0.95) * 1000,
+                    "total_s": self._seconds[key],
+                    "bytes": self._bytes[key],
+                })
+        return rows
+
+    def prometheus_text(self):
+        """Registry in Prometheus text exposition format"""
+        lines = [
+            "# HELP macro_duration_seconds Time spent per fetch, transform, figure build and render.",
+            "# TYPE macro_duration_seconds summary",
+        ]
+        rows = self.summary()
+        for row in rows:
+            labels = f'kind="{row["kind"]}",name="{_escape(row["name"])}"'
+            lines.append(f'macro_duration_seconds{{{labels},quantile="0.5"}} {row["p50_ms"] / 1000:.6f}')
+            lines.append(f'macro_duration_seconds{{{labels},quantile="0.95"}} {row["p95_ms"] / 1000:.6f}')
+            lines.append(f'macro_duration_seconds_sum{{{labels}}} {row["total_s"]:.6f}')
+            lines.append(f'macro_duration_seconds_count{{{labels}}} {row["count"]}')
+        lines += [
+            "# HELP macro_bytes_total Bytes fetched or produced.",
+            "# TYPE macro_bytes_total counter",
+        ]
+        for row in rows:
+            if row["bytes"]:
+                lines.append(f'macro_bytes_total{{kind="{row["kind"]}",name="{_escape(row["name"])}"}} {row["bytes"]}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path=METRICS_FILE):
+        """Atomically write the Prometheus export to path (no-op if path is unset)"""
+        if not path:
+            return
+        # One temp file per writer: concurrent sessions render (and export) at the same time
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, path)
+
+
+def _percentile(sorted_samples, q):
+    if not sorted_samples:
+        return 0.0
+    index = min(int(q * len(sorted_samples)), len(sorted_samples) - 1)
+    return sorted_samples[index]
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def frame_bytes(obj):
+    """Memory used by a pandas object's values and index (0 for anything else)"""
+    try:
+        usage = obj.memory_usage(index=True)
+    except (AttributeError, TypeError):
+        return 0
+    return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+
+
+# The registry everything records into
+metrics = Metrics()
+timed = metrics.timed
+record = metrics.record
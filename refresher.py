@@ -0,0 +1,108 @@
+"""Background refresher that keeps the series store warm, off the request path.
+
+Run it alongside the dashboard:
+
+    python refresher.py            # keep running, refreshing series as they come due
+    python refresher.py --once     # refresh whatever is due, then exit (e.g. from cron)
+    MACRO_READ_ONLY=1 streamlit run app.py
+
+With MACRO_READ_ONLY=1 page views only read the store, so neither the first
+visitor after a release nor a burst of visitors hits FRED or Yahoo. The FRED
+API key is read from FRED_API_KEY or from .streamlit/secrets.toml.
+
+With several app replicas, point MACRO_STORE_URL at storage they all share
+(a mounted directory or a redis:// URL) and one refresher serves them all.
+"""
+import argparse
+import logging
+import os
+import time
+import tomllib
+from datetime import datetime
+from pathlib import Path
+
+import datasets
+from engine import MacroEngine
+
+log = logging.getLogger("refresher")
+
+# How often to re-check a series, by publication cadence (seconds). Daily series
+# (DGS*, RRPONTSYD, market closes) land once per business day at varying times, so
+# poll them every half hour on weekdays; CPIAUCSL comes out once a month.
+REFRESH_EVERY = {
+    "daily": 30 * 60,
+    "weekly": 6 * 60 * 60,
+    "monthly": 6 * 60 * 60,
+}
+
+
+def load_api_key():
+    """FRED API key from the environment, falling back to Streamlit's secrets file"""
+    key = os.environ.get("FRED_API_KEY")
+    if key:
+        return key
+    with open(Path(".streamlit") / "secrets.toml", "rb") as f:
+        return tomllib.load(f)["fred"]["api_key"]
+
+
+def refresh_interval(spec, now):
+    """Seconds between refreshes for a spec at time `now`"""
+    frequency = spec.get("frequency", "daily")
+    # Nothing daily is published at weekends
+    if frequency == "daily" and datetime.fromtimestamp(now).weekday() >= 5:
+        return REFRESH_EVERY["weekly"]
+    return REFRESH_EVERY.get(frequency, REFRESH_EVERY["daily"])
+
+
+def due_specs(store, now=None):
+    """Specs whose stored copy is missing or older than their refresh interval.
+
+    Codes FRED recently said don't exist aren't due until the negative cache
+    entry expires (see datasets.MISSING_SERIES_TTL).
+    """
+    now = now or time.time()
+    due = []
+    for spec in datasets.SERIES_SPECS.values():
+        source, symbol = datasets.store_key(spec)
+        if store.missing_error(source, symbol, datasets.MISSING_SERIES_TTL):
+            continue
+        fetched_at = store.meta(source, symbol).get("fetched_at")
+        if fetched_at is None or now - fetched_at >= refresh_interval(spec, now):
+            due.append(spec)
+    return due
+
+
+def refresh(engine, specs, reprobe=False):
+    """Refresh the given specs in parallel, logging what succeeded and what failed"""
+    if not specs:
+        return
+    results, errors = engine.fetch_batch([spec["symbol"] for spec in specs], force=True, reprobe=reprobe)
+    for symbol in results:
+        log.info("refreshed %s", symbol)
+    for symbol, error in errors.items():
+        log.warning("could not refresh %s: %s", symbol, error)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keep the dashboard's series store up to date")
+    parser.add_argument("--once", action="store_true", help="refresh what is due and exit")
+    parser.add_argument("--all", action="store_true", help="refresh every series, due or not")
+    parser.add_argument("--reprobe", action="store_true",
+                        help="with --all, also re-ask FRED about codes it recently said don't exist")
+    parser.add_argument("--poll", type=int, default=60, help="seconds between schedule checks (default 60)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    engine = MacroEngine(fred_api_key=load_api_key())
+
+    if args.all:
+        refresh(engine, list(datasets.SERIES_SPECS.values()), reprobe=args.reprobe)
+    while True:
+        refresh(engine, due_specs(engine.store))
+        if args.once:
+            return
+        time.sleep(args.poll)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""Rolling analytics (realized vol, z-scores, drawdowns, percentile ranks, correlations)
+that update incrementally as series grow.
+
+Each indicator keeps a small running state (window sums, the running peak, a
+sorted copy of the window), so extending a series by one observation costs
+O(1) per indicator (percentile ranks: a binary search plus a window-sized
+insert) instead of a pass over 25 years of history. The first pass over a
+history is vectorized with pandas; later calls only step through what's new.
+If a refresh revised observations that were already processed (see the
+store's revision window), the state is rebuilt from just before the first
+changed date and only the rows after it are recomputed.
+"""
+import bisect
+import math
+import threading
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+
+# Default windows, in observations
+VOL_WINDOW = 21          # ~1 month of daily returns
+ZSCORE_WINDOW = 252      # ~1 year
+RANK_WINDOW = 252
+CORRELATION_WINDOW = 63  # ~3 months
+
+# More new rows than this and a vectorized pass beats stepping through them
+MAX_STEPS = 1000
+
+
+class RollingMoments:
+    """Mean and sample standard deviation of the last `window` values, O(1) per push"""
+
+    def __init__(self, window, values=()):
+        self.window = window
+        self._values = deque()
+        self._sum = self._sumsq = 0.0
+        self._since_resum = 0
+        for value in values:
+            self.push(value)
+
+    def push(self, x):
+        self._values.append(x)
+        self._sum += x
+        self._sumsq += x * x
+        if len(self._values) > self.window:
+            old = self._values.popleft()
+            self._sum -= old
+            self._sumsq -= old * old
+        # Running sums drift as values come and go; re-add them once per window (amortized O(1))
+        self._since_resum += 1
+        if self._since_resum >= self.window:
+            self._sum = math.fsum(self._values)
+            self._sumsq = math.fsum(v * v for v in self._values)
+            self._since_resum = 0
+
+        n = len(self._values)
+        if n < self.window or n < 2:
+            return math.nan, math.nan
+        mean = self._sum / n
+        var = max((self._sumsq - n * mean * mean) / (n - 1), 0.0)
+        return mean, math.sqrt(var)
+
+
+class RollingCorrelation:
+    """Pearson correlation of the last `window` (x, y) pairs, O(1) per push"""
+
+    def __init__(self, window, pairs=()):
+        self.window = window
+        self._pairs = deque()
+        self._sx = self._sy = self._sxx = self._syy = self._sxy = 0.0
+        for x, y in pairs:
+            self.push(x, y)
+
+    def push(self, x, y):
+        self._pairs.append((x, y))
+        self._add(x, y, 1)
+        if len(self._pairs) > self.window:
+            self._add(*self._pairs.popleft(), -1)
+
+        n = len(self._pairs)
+        if n < self.window or n < 2:
+            return math.nan
+        cov = self._sxy - self._sx * self._sy / n
+        var_x = self._sxx - self._sx * self._sx / n
+        var_y = self._syy - self._sy * self._sy / n
+        if var_x <= 0 or var_y <= 0:
+            return math.nan
+        return cov / math.sqrt(var_x * var_y)
+
+    def _add(self, x, y, sign):
+        self._sx += sign * x
+        self._sy += sign * y
+        self._sxx += sign * x * x
+        self._syy += sign * y * y
+        self._sxy += sign * x * y
+
+
+class RollingRank:
+    """Percent of the last `window` values at or below the newest one"""
+
+    def __init__(self, window, values=()):
+        self.window = window
+        self._values = deque()
+        self._sorted = []
+        for value in values:
+            self.push(value)
+
+    def push(self, x):
+        self._values.append(x)
+        bisect.insort(self._sorted, x)
+        if len(self._values) > self.window:
+            old = self._values.popleft()
+            del self._sorted[bisect.bisect_left(self._sorted, old)]
+        if len(self._values) < self.window:
+            return math.nan
+        return bisect.bisect_right(self._sorted, x) / len(self._sorted) * 100
+
+
+def _changes(values, kind):
+    """Period-over-period changes: log returns for prices, differences for levels"""
+    return np.diff(np.log(values)) if kind == "price" else np.diff(values)
+
+
+class _Incremental:
+    """Shared bookkeeping: work out which input rows are new or revised and only process those"""
+
+    columns = []
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inputs = None
+        self._output = None
+
+    def extend(self, frame):
+        """Bring the indicators up to date with `frame` and return the full output frame"""
+        frame = frame.dropna().sort_index()
+        with self._lock:
+            start = self._first_change(frame)
+            if self._inputs is None or start == 0 or len(frame) - start > MAX_STEPS:
+                self._output = self._bulk(frame)
+                self._reset(frame.to_numpy(dtype=float))
+            elif start < len(frame) or start < len(self._inputs):
+                self._output = self._output.iloc[:start]
+                values = frame.to_numpy(dtype=float)
+                if start < len(self._inputs):
+                    # Revised rows: rebuild the state from the unchanged prefix
+                    self._reset(values[:start])
+                rows = [self._step(row) for row in values[start:]]
+                new = pd.DataFrame(rows, index=frame.index[start:], columns=self.columns, dtype=float)
+                self._output = pd.concat([self._output, new]) if len(new) else self._output
+            self._inputs = frame
+            return self._output.copy()
+
+    def _first_change(self, frame):
+        """Position of the first row of frame that wasn't processed before, with the same value"""
+        if self._inputs is None or list(frame.columns) != list(self._inputs.columns):
+            return 0
+        n = min(len(frame), len(self._inputs))
+        same = ((frame.index[:n] == self._inputs.index[:n])
+                & (frame.to_numpy(dtype=float)[:n] == self._inputs.to_numpy(dtype=float)[:n]).all(axis=1))
+        return n if same.all() else int(np.argmin(same))
+
+
+class SeriesAnalytics(_Incremental):
+    """Realized vol, z-score, percentile rank and (for prices) drawdown of one series.
+
+    kind="price" uses log returns for volatility (annualized, in %); kind="level"
+    (yields, spreads, VIX) uses daily changes (annualized, in the series' units).
+    """
+
+    columns = ["vol", "zscore", "pct_rank", "drawdown"]
+
+    def __init__(self, kind="price", vol_window=VOL_WINDOW, zscore_window=ZSCORE_WINDOW, rank_window=RANK_WINDOW):
+        super().__init__()
+        self.kind = kind
+        self.vol_window = vol_window
+        self.zscore_window = zscore_window
+        self.rank_window = rank_window
+
+    def extend(self, series):
+        return super().extend(series.to_frame("value"))
+
+    def _bulk(self, frame):
+        x = frame["value"]
+        changes = np.log(x).diff() if self.kind == "price" else x.diff()
+        vol_scale = math.sqrt(TRADING_DAYS) * (100 if self.kind == "price" else 1)
+        level = x.rolling(self.zscore_window)
+        out = pd.DataFrame({
+            "vol": changes.rolling(self.vol_window).std() * vol_scale,
+            "zscore": (x - level.mean()) / level.std(),
+            "pct_rank": x.rolling(self.rank_window).rank(method="max", pct=True) * 100,
+            "drawdown": (x / x.cummax() - 1) * 100 if self.kind == "price" else np.nan,
+        }, index=x.index)
+        return out[self.columns].astype(float)
+
+    def _reset(self, values):
+        x = values[:, 0]
+        self._last = x[-1] if len(x) else math.nan
+        self._vol = RollingMoments(self.vol_window, _changes(x[-self.vol_window - 1:], self.kind))
+        self._level = RollingMoments(self.zscore_window, x[-self.zscore_window:])
+        self._rank = RollingRank(self.rank_window, x[-self.rank_window:])
+        self._peak = x.max() if len(x) else -math.inf
+
+    def _step(self, row):
+        x = row[0]
+        vol = math.nan
+        if not math.isnan(self._last):
+            change = math.log(x / self._last) if self.kind == "price" else x - self._last
+            vol = self._vol.push(change)[1] * math.sqrt(TRADING_DAYS) * (100 if self.kind == "price" else 1)
+        self._last = x
+        mean, std = self._level.push(x)
+        zscore = (x - mean) / std if std else math.nan
+        pct_rank = self._rank.push(x)
+        drawdown = math.nan
+        if self.kind == "price":
+            self._peak = max(self._peak, x)
+            drawdown = (x / self._peak - 1) * 100
+        return vol, zscore, pct_rank, drawdown
+
+
+class PairCorrelation(_Incremental):
+    """Rolling correlation of two series' daily changes, on the dates both have"""
+
+    columns = ["correlation"]
+
+    def __init__(self, kinds=("price", "price"), window=CORRELATION_WINDOW):
+        super().__init__()
+        self.kinds = kinds
+        self.window = window
+
+    def extend(self, x, y):
+        return super().extend(pd.concat([x, y], axis=1, keys=["x", "y"], join="inner"))["correlation"]
+
+    def _bulk(self, frame):
+        changes = [np.log(frame[c]).diff() if kind == "price" else frame[c].diff()
+                   for c, kind in zip(["x", "y"], self.kinds)]
+        return changes[0].rolling(self.window).corr(changes[1]).to_frame("correlation")
+
+    def _reset(self, values):
+        self._last = values[-1] if len(values) else None
+        tail = values[-self.window - 1:]
+        pairs = zip(*(_changes(tail[:, i], kind) for i, kind in enumerate(self.kinds)))
+        self._corr = RollingCorrelation(self.window, pairs)
+
+    def _step(self, row):
+        corr = math.nan
+        if self._last is not None:
+            x, y = (math.log(row[i] / self._last[i]) if kind == "price" else row[i] - self._last[i]
+                    for i, kind in enumerate(self.kinds))
+            corr = self._corr.push(x, y)
+        self._last = row
+        return (corr,)
@@ -0,0 +1,361 @@
+"""Persistent store for the time series the dashboard plots.
+
+Each series is kept as a Parquet blob keyed by source + symbol, with a small
+JSON sidecar recording when it was fetched. A series is served from the store
+until its TTL (which depends on how often the series is published) runs out.
+
+Series whose revisions matter (CPI) also keep every vintage, ALFRED-style:
+each observation's value with the real-time period it was the published
+one. Refreshing those asks FRED only about real time since the last check,
+and as_of() gives the series as it stood on any past day.
+
+Blobs live in a local directory by default. Point MACRO_STORE_URL at a shared
+directory or a redis:// URL (see store_backends.py) and every replica of the
+app shares one store: a series is fetched upstream once, by whichever replica
+gets to it first, and the rest read that copy.
+"""
+import io
+import json
+import os
+import re
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from compact import compact
+from store_backends import backend_for
+
+DEFAULT_STORE_DIR = os.environ.get("MACRO_STORE_URL") or os.environ.get("MACRO_STORE_DIR", ".series_store")
+
+# How long a stored series stays fresh (seconds), by publication frequency
+TTL_BY_FREQUENCY = {
+    "daily": 6 * 60 * 60,
+    "weekly": 24 * 60 * 60,
+    "monthly": 24 * 60 * 60,
+}
+
+# Trailing window (days) re-pulled on each refresh to pick up revisions
+REVISION_DAYS_BY_FREQUENCY = {
+    "daily": int(os.environ.get("MACRO_REVISION_DAYS", 7)),
+    "weekly": 21,
+    "monthly": 93,
+}
+
+# Relative difference between a stored value and a re-fetched one that counts as a rescale
+# (a quarterly SPY dividend moves adjusted closes by ~0.3%)
+OVERLAP_RTOL = 1e-4
+
+# Parsed frames, in compact read-only form and shared by everything in the process.
+# Each is tagged with the sidecar's written_at, so a write by any process is picked up.
+_frames = {}
+_frames_lock = threading.Lock()
+
+
+def _file_stem(source, symbol):
+    """Turn source + symbol into a safe file name, e.g. yahoo__VIX for ^VIX"""
+    safe_symbol = re.sub(r"[^A-Za-z0-9._-]", "", symbol)
+    return f"{source}__{safe_symbol}"
+
+
+class SeriesStore:
+    """Parquet-backed series store with a TTL per series frequency"""
+
+    def __init__(self, root=DEFAULT_STORE_DIR, read_only=False):
+        # root: a directory, a redis:// URL or a backend from store_backends
+        # read_only: serve whatever is stored and leave refreshing to refresher.py
+        self.backend = backend_for(root)
+        self.read_only = read_only
+
+    def _names(self, source, symbol):
+        stem = _file_stem(source, symbol)
+        return f"{stem}.parquet", f"{stem}.json"
+
+    def read(self, source, symbol):
+        """Return the stored frame (compact and read-only, see compact.py), or None if nothing is stored yet"""
+        data_name, _ = self._names(source, symbol)
+        key = (self.backend.cache_key, data_name)
+        version = self.meta(source, symbol).get("written_at")
+        with _frames_lock:
+            cached = _frames.get(key)
+        if version is not None and cached is not None and cached[0] == version:
+            return cached[1]
+
+        frame = compact(self._read_full(source, symbol))
+        if version is not None and frame is not None:
+            with _frames_lock:
+                _frames[key] = (version, frame)
+        return frame
+
+    def _read_full(self, source, symbol):
+        """The stored frame at full stored precision, bypassing the in-memory cache"""
+        data_name, _ = self._names(source, symbol)
+        data = self.backend.read(data_name)
+        if data is None:
+            return None
+        return pd.read_parquet(io.BytesIO(data))
+
+    def meta(self, source, symbol):
+        """Return the sidecar metadata for a series ({} if missing)"""
+        _, meta_name = self._names(source, symbol)
+        try:
+            raw = self.backend.read(meta_name)
+            return json.loads(raw) if raw else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _write_meta(self, source, symbol, meta):
+        _, meta_name = self._names(source, symbol)
+        self.backend.write(meta_name, json.dumps(meta).encode())
+
+    def write(self, source, symbol, frame, frequency="daily"):
+        """Save a frame (or series) and stamp the fetch time; returns it in compact form"""
+        if isinstance(frame, pd.Series):
+            frame = frame.to_frame("value")
+        data_name, _ = self._names(source, symbol)
+        buffer = io.BytesIO()
+        frame.to_parquet(buffer)
+        # Data first, then the sidecar, so a fresh timestamp never points at old data
+        self.backend.write(data_name, buffer.getvalue())
+
+        now = time.time()
+        self._write_meta(source, symbol, {
+            "source": source,
+            "symbol": symbol,
+            "frequency": frequency,
+            "fetched_at": now,
+            "written_at": now,
+            "rows": len(frame),
+            "last_date": str(frame.index.max()) if len(frame) else None,
+        })
+        stored = compact(frame)
+        with _frames_lock:
+            _frames[(self.backend.cache_key, data_name)] = (now, stored)
+        return stored
+
+    def is_fresh(self, source, symbol, frequency="daily"):
+        """True if the series was fetched within its frequency's TTL"""
+        fetched_at = self.meta(source, symbol).get("fetched_at")
+        if fetched_at is None:
+            return False
+        ttl = TTL_BY_FREQUENCY.get(frequency, TTL_BY_FREQUENCY["daily"])
+        return time.time() - fetched_at < ttl
+
+    def mark_missing(self, source, symbol, error):
+        """Remember that a series could not be found, so we stop asking for it for a while"""
+        meta = self.meta(source, symbol)
+        meta.update({"source": source, "symbol": symbol, "missing_at": time.time(), "error": str(error)})
+        self._write_meta(source, symbol, meta)
+
+    def missing_error(self, source, symbol, ttl):
+        """The recorded error if the series was marked missing within ttl seconds, else None"""
+        meta = self.meta(source, symbol)
+        missing_at = meta.get("missing_at")
+        if missing_at is None or time.time() - missing_at >= ttl:
+            return None
+        return meta.get("error", "series not found")
+
+    def touch(self, source, symbol):
+        """Mark a stored series as just checked without rewriting its data"""
+        meta = self.meta(source, symbol)
+        if not meta:
+            return
+        meta["fetched_at"] = time.time()
+        self._write_meta(source, symbol, meta)
+
+    def vintages(self, source, symbol):
+        """Every stored vintage of a series (date, value, realtime_start, realtime_end), or None.
+
+        realtime_end is NaT for values that are still the current ones.
+        """
+        data = self.backend.read(f"{_file_stem(source, symbol)}.vintages.parquet")
+        if data is None:
+            return None
+        return pd.read_parquet(io.BytesIO(data))
+
+    def as_of(self, source, symbol, date):
+        """The series as it was published on `date` (point in time), or None if no vintages are stored"""
+        vintages = self.vintages(source, symbol)
+        if vintages is None:
+            return None
+        date = pd.Timestamp(date)
+        valid = (vintages["realtime_start"] <= date) & (vintages["realtime_end"].isna() | (vintages["realtime_end"] >= date))
+        return _by_date(vintages[valid], symbol)
+
+    def get_or_fetch(self, source, symbol, fetch, frequency="daily", revision_days=None, force=False,
+                     check_overlap=False):
+        """Serve the series from disk if fresh, otherwise refresh it and store it.
+
+        fetch(since) is called with since=None for a full download, or with a
+        start date when only the tail is needed. Refreshes re-pull a trailing
+        window (revision_days, default by frequency) so revised observations
+        overwrite the stored ones. If the fetch fails but an older copy is on
+        disk, the old copy is returned.
+
+        check_overlap=True is for sources that rescale their whole history
+        (adjusted prices): if the tail disagrees with the stored values on
+        dates before the newest stored one, everything is downloaded again
+        rather than splicing two scales together.
+
+        force=True refreshes even if the stored copy is still fresh. A read-only
+        store never refreshes a stored copy; it only fetches series that are
+        missing entirely (e.g. before the refresher's first run).
+        """
+        cached = self.read(source, symbol)
+        if cached is not None and (self.read_only or (not force and self.is_fresh(source, symbol, frequency))):
+            return cached
+
+        # One process refreshes a series at a time. Anyone who waited on the lock
+        # gets the copy the holder just wrote instead of fetching it again.
+        fetched_at = self.meta(source, symbol).get("fetched_at")
+        with self.backend.lock(_file_stem(source, symbol)):
+            if self.meta(source, symbol).get("fetched_at") != fetched_at:
+                latest = self.read(source, symbol)
+                if latest is not None and self.is_fresh(source, symbol, frequency):
+                    return latest
+                cached = latest if latest is not None else cached
+            return self._refresh(source, symbol, cached, fetch, frequency, revision_days, check_overlap)
+
+    def _refresh(self, source, symbol, cached, fetch, frequency, revision_days, check_overlap=False):
+        since = None
+        if cached is not None and not cached.empty:
+            if revision_days is None:
+                revision_days = REVISION_DAYS_BY_FREQUENCY.get(frequency, REVISION_DAYS_BY_FREQUENCY["daily"])
+            since = cached.index.max() - pd.Timedelta(days=revision_days)
+
+        try:
+            fresh = fetch(since)
+        except Exception:
+            if cached is not None:
+                return cached
+            raise
+
+        if isinstance(fresh, pd.Series):
+            fresh = fresh.to_frame("value")
+        if fresh is None or fresh.empty:
+            if cached is not None:
+                self.touch(source, symbol)
+                return cached
+            return fresh
+
+        if since is not None:
+            # Merge into the full-precision history, not the compact in-memory copy
+            history = self._read_full(source, symbol)
+            if check_overlap and rescaled(history, fresh):
+                # Upstream rescaled its history: start over rather than leave a step at `since`
+                try:
+                    full = self._refresh(source, symbol, None, fetch, frequency, revision_days)
+                except Exception:
+                    return cached
+                return cached if full is None or full.empty else full
+            fresh = merge_tail(history, fresh, since)
+        return self.write(source, symbol, fresh, frequency=frequency)
+
+
+    def get_or_fetch_vintages(self, source, symbol, fetch, frequency="daily", force=False):
+        """get_or_fetch for a series whose vintages are kept (see merge_vintages).
+
+        fetch(since) returns the observation rows (date, value, realtime_start,
+        realtime_end) that were current at any time from `since` on, or every
+        vintage for since=None. Returns the current values, like get_or_fetch.
+        """
+        cached = self.read(source, symbol)
+        has_vintages = "realtime_checked" in self.meta(source, symbol)
+        if cached is not None and (self.read_only or (has_vintages and not force and self.is_fresh(source, symbol, frequency))):
+            return cached
+
+        fetched_at = self.meta(source, symbol).get("fetched_at")
+        with self.backend.lock(_file_stem(source, symbol)):
+            if self.meta(source, symbol).get("fetched_at") != fetched_at:
+                latest = self.read(source, symbol)
+                if latest is not None and self.is_fresh(source, symbol, frequency):
+                    return latest
+                cached = latest if latest is not None else cached
+            return self._refresh_vintages(source, symbol, cached, fetch, frequency)
+
+    def _refresh_vintages(self, source, symbol, cached, fetch, frequency):
+        meta = self.meta(source, symbol)
+        # A series stored before it had vintages gets its full history once
+        stored = self.vintages(source, symbol) if "realtime_checked" in meta else None
+        since = pd.Timestamp(meta["realtime_checked"]) if stored is not None else None
+        checked = pd.Timestamp.today().normalize()
+
+        try:
+            fresh = fetch(since)
+        except Exception:
+            if cached is not None:
+                return cached
+            raise
+        if fresh is None or fresh.empty:
+            if cached is not None:
+                self.touch(source, symbol)
+                return cached
+            return fresh
+
+        vintages = fresh if since is None else merge_vintages(stored, fresh, since)
+        current = _by_date(vintages[vintages["realtime_end"].isna()], "value")
+
+        buffer = io.BytesIO()
+        vintages.to_parquet(buffer)
+        self.backend.write(f"{_file_stem(source, symbol)}.vintages.parquet", buffer.getvalue())
+        stored_frame = self.write(source, symbol, current.to_frame("value"), frequency=frequency)
+        self._write_meta(source, symbol, {**self.meta(source, symbol), "realtime_checked": str(checked.date())})
+        return stored_frame
+
+
+def cache_stats():
+    """Series held in the in-memory frame cache and their value bytes"""
+    with _frames_lock:
+        frames = [frame for _, frame in _frames.values()]
+    return {"series": len(frames), "value_bytes": sum(int(frame.to_numpy().nbytes) for frame in frames)}
+
+
+def merge_tail(history, tail, since):
+    """Replace everything in history from `since` onwards with the freshly fetched tail"""
+    tail = tail[tail.index >= since]
+    kept = history[history.index < since]
+    merged = pd.concat([kept, tail])
+    merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+    return merged
+
+
+def rescaled(history, tail):
+    """True if tail disagrees with history on the dates both have before history's last one.
+
+    The last stored row is left out, since it may have been an intraday bar.
+    """
+    dates = history.index[history.index < history.index.max()].intersection(tail.index)
+    columns = history.columns.intersection(tail.columns)
+    old = history.loc[dates, columns].to_numpy(dtype=float)
+    new = tail.loc[dates, columns].to_numpy(dtype=float)
+    both = ~np.isnan(old) & ~np.isnan(new)
+    return not np.allclose(old[both], new[both], rtol=OVERLAP_RTOL, atol=0)
+
+
+def merge_vintages(history, fresh, since):
+    """Replace what history says about real time from `since` on with freshly fetched vintages.
+
+    FRED clips the periods it returns to start at the requested realtime_start,
+    so periods still open at `since` are closed the day before, and a value
+    that carried on unchanged across `since` is joined back into one period.
+    """
+    day = pd.Timedelta(days=1)
+    kept = history[history["realtime_start"] < since].copy()
+    still_open = kept["realtime_end"].isna() | (kept["realtime_end"] >= since)
+    kept.loc[still_open, "realtime_end"] = since - day
+    merged = pd.concat([kept, fresh], ignore_index=True).sort_values(["date", "realtime_start"], ignore_index=True)
+
+    previous = merged.shift()
+    unchanged = (merged["value"] == previous["value"]) | (merged["value"].isna() & previous["value"].isna())
+    joined = np.flatnonzero(((merged["realtime_start"] == since) & (previous["date"] == merged["date"])
+                             & (previous["realtime_end"] == since - day) & unchanged).to_numpy())
+    end = merged.columns.get_loc("realtime_end")
+    merged.iloc[joined - 1, end] = merged.iloc[joined, end].to_numpy()
+    return merged.drop(index=joined).reset_index(drop=True)
+
+
+def _by_date(rows, name):
+    """Vintage rows as a Series indexed by observation date"""
+    rows = rows.sort_values("date")
+    return pd.Series(rows["value"].to_numpy(dtype=float), index=pd.DatetimeIndex(rows["date"], name=None), name=name)
@@ -0,0 +1,129 @@
+"""Storage backends for SeriesStore, so several dashboard replicas can share one store.
+
+A backend stores named blobs and hands out a cross-process lock per name:
+
+- FileBackend: a directory, either local or on a disk every replica mounts
+  (NFS, EFS, ...). Writes are atomic renames; locks are flock()ed lock files.
+- RedisBackend: any Redis-compatible server (Redis, Valkey, KeyDB, ...).
+  Locks are SET NX keys with an expiry, so a crashed replica can't hold one forever.
+
+backend_for(location) picks one from a path or a redis:// URL.
+"""
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: file locks become no-ops
+    fcntl = None
+
+# How long to wait for another process's lock before going ahead anyway (seconds)
+LOCK_TIMEOUT = float(os.environ.get("MACRO_STORE_LOCK_TIMEOUT", 60))
+
+
+class FileBackend:
+    """Blobs as files in a directory"""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        # Identifies the storage for process-wide caches of what's in it
+        self.cache_key = str(self.root.resolve())
+
+    def read(self, name):
+        """The blob's bytes, or None if it doesn't exist"""
+        try:
+            return (self.root / name).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def write(self, name, data):
+        # Write to a per-process temp file first so readers never see a half-written file
+        tmp = self.root / f"{name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        tmp.write_bytes(data)
+        os.replace(tmp, self.root / name)
+
+    @contextmanager
+    def lock(self, name, timeout=LOCK_TIMEOUT):
+        """Hold an exclusive lock on name across processes; yields False if it timed out"""
+        if fcntl is None:
+            yield True
+            return
+        with open(self.root / f"{name}.lock", "a") as f:
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    acquired = True
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        acquired = False
+                        break
+                    time.sleep(0.05)
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class RedisBackend:
+    """Blobs as keys in a Redis-compatible server.
+
+    client only needs redis-py's get/set(nx=, px=)/delete, so anything with
+    the same interface (e.g. a local stand-in in tests) works.
+    """
+
+    def __init__(self, client, prefix="macro:", name=None):
+        self.client = client
+        self.prefix = prefix
+        self.cache_key = f"{name or id(client)}|{prefix}"
+
+    def read(self, name):
+        return self.client.get(self.prefix + name)
+
+    def write(self, name, data):
+        self.client.set(self.prefix + name, data)
+
+    @contextmanager
+    def lock(self, name, timeout=LOCK_TIMEOUT):
+        """Hold an exclusive lock on name across replicas; yields False if it timed out"""
+        key = f"{self.prefix}{name}:lock"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + timeout
+        # The key expires on its own if the holder dies mid-fetch
+        while not (acquired := self.client.set(key, token, nx=True, px=int(timeout * 1000))):
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(0.05)
+        try:
+            yield bool(acquired)
+        finally:
+            if acquired:
+                held = self.client.get(key)
+                if held in (token, token.encode()):
+                    self.client.delete(key)
+
+
+# One client (and connection pool) per Redis URL for the life of the process
+_redis_clients = {}
+_redis_lock = threading.Lock()
+
+
+def backend_for(location):
+    """A backend for a directory path or a redis:// / rediss:// / unix:// URL"""
+    if not isinstance(location, (str, os.PathLike)):
+        return location  # already a backend
+    url = str(location)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        import redis
+        with _redis_lock:
+            if url not in _redis_clients:
+                _redis_clients[url] = redis.Redis.from_url(url)
+        return RedisBackend(_redis_clients[url], name=url)
+    return FileBackend(location)
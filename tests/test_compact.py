@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from compact import CalendarRegistry, calendars, compact
+
+
+def series(values, start="2024-01-01"):
+    return pd.Series(values, index=pd.bdate_range(start, periods=len(values)), name="value")
+
+
+@pytest.mark.parametrize("values", [
+    [4.25, 4.31, 4.28],                 # FRED yields
+    [452.13, 455.87, 449.02],           # Yahoo closes
+    [308.417, 309.685, 310.326],        # CPI index
+    [np.nan, 1.5, np.nan],
+    [np.nan, np.nan, np.nan],
+])
+def test_float32_where_published_decimals_survive(values):
+    compacted = compact(series(values))
+    assert compacted.dtype == np.float32
+    np.testing.assert_array_equal(np.round(compacted.to_numpy(dtype=float), 4), np.round(values, 4))
+
+
+@pytest.mark.parametrize("values", [
+    [1234567.89, 1234568.01, 1234569.25],   # millions with cents: float32 keeps ~7 digits
+    [6_500_000_000.5, 6_500_000_001.0, 6_500_000_002.0],
+    [1e39, 1.0, 2.0],                      # out of float32 range
+])
+def test_float64_when_float32_would_lose_decimals(values):
+    compacted = compact(series(values))
+    assert compacted.dtype == np.float64
+    np.testing.assert_array_equal(compacted.to_numpy(), values)
+
+
+def test_dtype_is_chosen_per_frame():
+    frame = pd.DataFrame({"SPY": [452.13, 455.87], "WALCL": [7654321.25, 7654322.5]},
+                         index=pd.bdate_range("2024-01-01", periods=2))
+    assert compact(frame).to_numpy().dtype == np.float64
+    assert compact(frame[["SPY"]]).to_numpy().dtype == np.float32
+
+
+def test_values_are_read_only():
+    compacted = compact(series([1.0, 2.0, 3.0]))
+    assert not compacted.to_numpy().flags.writeable
+    with pytest.raises(ValueError):
+        compacted.to_numpy()[0] = 5.0
+    frame = compact(pd.DataFrame({"a": [1.0, 2.0]}, index=pd.bdate_range("2024-01-01", periods=2)))
+    assert not frame.to_numpy().flags.writeable
+
+
+def test_series_on_one_calendar_share_its_index():
+    dates = pd.bdate_range("2000-01-03", periods=500)
+    a = compact(pd.Series(np.arange(500.0), index=dates))
+    b = compact(pd.Series(np.arange(500.0), index=pd.DatetimeIndex(list(dates))))
+    assert b.index is a.index
+
+
+def test_contiguous_stretch_is_a_view_of_the_calendar():
+    registry = CalendarRegistry()
+    calendar = registry.intern(pd.bdate_range("2010-01-01", periods=300))
+    stretch = registry.intern(pd.DatetimeIndex(list(calendar[50:120])))
+    assert stretch.equals(calendar[50:120])
+    assert np.shares_memory(stretch.asi8, calendar.asi8)
+    # Dates that aren't a stretch of it get their own calendar
+    other = registry.intern(pd.date_range("2010-01-01", periods=70, freq="D"))
+    assert not np.shares_memory(other.asi8, calendar.asi8)
+    assert registry.stats()["calendars"] == 2
+
+
+def test_passes_through_non_frames():
+    assert compact(None) is None
+    assert compact([1, 2]) == [1, 2]
+    assert calendars.intern(pd.Index([1, 2])).equals(pd.Index([1, 2]))
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from transforms import CpiDeflator
+
+CPI = pd.Series([300.0, 303.0, 306.03, 309.0], index=pd.date_range("2024-01-01", periods=4, freq="MS"))
+
+
+def test_level_hits_each_print_on_the_first_of_the_month():
+    deflator = CpiDeflator(CPI)
+    np.testing.assert_allclose(deflator.level(CPI.index), CPI.to_numpy())
+
+
+def test_level_is_log_linear_between_prints():
+    deflator = CpiDeflator(CPI)
+    # Halfway through January (31 days) is the geometric mean of the two prints
+    midpoint = pd.Timestamp("2024-01-01") + pd.Timedelta(hours=31 * 12)
+    assert deflator.level(pd.DatetimeIndex([midpoint]))[0] == pytest.approx(np.sqrt(300.0 * 303.0))
+    january = pd.date_range("2024-01-01", "2024-02-01")
+    steps = np.diff(np.log(deflator.level(january)))
+    np.testing.assert_allclose(steps, steps[0])
+
+
+def test_level_is_flat_after_the_last_print_and_nan_before_the_first():
+    deflator = CpiDeflator(CPI)
+    level = deflator.level(pd.DatetimeIndex(["2023-12-31", "2024-04-01", "2024-04-20", "2025-01-01"]))
+    assert np.isnan(level[0])
+    np.testing.assert_allclose(level[1:], 309.0)
+
+
+def test_ignores_missing_and_unsorted_prints():
+    messy = pd.concat([CPI.iloc[2:], pd.Series([np.nan], index=[pd.Timestamp("2024-05-01")]), CPI.iloc[:2]])
+    np.testing.assert_allclose(CpiDeflator(messy).level(CPI.index), CPI.to_numpy())
+
+
+def test_real_line_starts_at_the_nominal_price():
+    index = pd.bdate_range("2023-12-01", "2024-05-31")
+    prices = pd.DataFrame({"SPY": np.linspace(450, 520, len(index)), "IWM": np.nan}, index=index)
+    prices.loc["2024-02-01":, "IWM"] = 200.0
+    deflator = CpiDeflator(CPI)
+
+    # SPY's first price predates the CPI, so its line starts on the first print
+    base = deflator.base_dates(prices)
+    assert list(base) == [pd.Timestamp("2024-01-01"), pd.Timestamp("2024-02-01")]
+    real = deflator.deflate(prices)
+    assert real.loc["2024-01-01", "SPY"] == pytest.approx(prices.loc["2024-01-01", "SPY"])
+    assert real.loc["2024-02-01", "IWM"] == pytest.approx(200.0)
+    assert real.loc[:"2023-12-29", "SPY"].isna().all()
+    # A flat nominal price loses value as the CPI rises
+    assert real.loc["2024-04-01", "IWM"] == pytest.approx(200.0 * 303.0 / 309.0)
+
+
+def test_deflate_a_series_and_a_tail():
+    index = pd.bdate_range("2024-01-01", "2024-04-30")
+    prices = pd.Series(np.linspace(100, 110, len(index)), index=index, name="SPY")
+    deflator = CpiDeflator(CPI)
+    full = deflator.deflate(prices)
+    assert full.name == "SPY" and full.iloc[0] == pytest.approx(100.0)
+    tail = deflator.deflate(prices, base_date=deflator.base_dates(prices), since=pd.Timestamp("2024-03-01"))
+    pd.testing.assert_series_equal(tail, full.loc["2024-03-01":])
+
+
+def test_revision_start_is_the_preceding_print():
+    deflator = CpiDeflator(CPI)
+    assert deflator.revision_start(pd.Timestamp("2024-03-01")) == pd.Timestamp("2024-02-01")
+    # A date between prints is revised from the print before it
+    assert deflator.revision_start(pd.Timestamp("2024-03-15")) == pd.Timestamp("2024-03-01")
+    assert deflator.revision_start(pd.Timestamp("2024-01-01")) is None
+
+
+def test_version_changes_with_a_revision():
+    revised = CPI.copy()
+    revised.iloc[1] = 303.1
+    assert CpiDeflator(CPI).version != CpiDeflator(revised).version
+    assert CpiDeflator(pd.Series(dtype=float)).version is None
@@ -0,0 +1,134 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+import requests
+
+import fred_client
+from bench import stand_ins
+from datasets import is_missing_series_error
+from fred_client import FredClient, TokenBucket, bucket_for
+
+SERIES = pd.Series(np.arange(35, dtype=float) / 4, index=pd.bdate_range("2024-01-01", periods=35))
+SERIES.iloc[3] = np.nan
+
+
+servers = []
+
+
+@pytest.fixture(autouse=True)
+def fixtures(monkeypatch):
+    """Serve made-up series instead of bench/fixtures, which may not be there"""
+    monkeypatch.setattr(stand_ins, "_cache", {})
+    monkeypatch.setattr(stand_ins.fixtures, "load_fred", {"DGS10": SERIES}.get)
+    yield
+    while servers:
+        server = servers.pop()
+        server.shutdown()
+        server.server_close()
+
+
+def serve(**kwargs):
+    server = stand_ins.FredServer(**kwargs).start()
+    servers.append(server)
+    client = FredClient("test-key", base_url=server.url, session=requests.Session(),
+                        bucket=TokenBucket(rate=1000, capacity=1000))
+    return server, client
+
+
+def requests_for(code):
+    return sum(1 for source, series_id in stand_ins.calls if series_id == code)
+
+
+def test_get_series():
+    _, client = serve()
+    series = client.get_series("DGS10", observation_start="2024-01-02")
+    assert series.index[0] == pd.Timestamp("2024-01-02")
+    np.testing.assert_array_equal(series.to_numpy(), SERIES.iloc[1:].to_numpy())
+    assert series.name == "DGS10"
+
+
+def test_pages_through_long_results(monkeypatch):
+    monkeypatch.setattr(fred_client, "PAGE_LIMIT", 10)
+    _, client = serve()
+    before = requests_for("DGS10")
+    rows = client.get_observations("DGS10")
+    assert requests_for("DGS10") - before == 4
+    assert rows["date"].tolist() == list(SERIES.index)
+
+
+def test_still_current_becomes_nat():
+    _, client = serve()
+    rows = client.get_observations("DGS10", realtime_start="2024-06-01", realtime_end=fred_client.STILL_CURRENT)
+    assert rows["realtime_end"].isna().all()
+    assert (rows["realtime_start"] == pd.Timestamp("2024-06-01")).all()
+    assert rows["value"].isna().sum() == 1
+
+
+def test_unknown_code_raises_value_error():
+    _, client = serve()
+    with pytest.raises(ValueError, match="does not exist") as error:
+        client.get_series("NOSUCHSERIES")
+    assert is_missing_series_error(error.value)
+
+
+def test_429_pauses_for_retry_after_then_retries():
+    server, client = serve(max_per_minute=2, window=1)
+    client.get_series("DGS10")
+    client.get_series("DGS10")
+    start = time.monotonic()
+    series = client.get_series("DGS10")
+    assert server.rejected == 1
+    assert time.monotonic() - start >= 0.9   # Retry-After: 1
+    assert len(series) == len(SERIES)
+
+
+def test_429_gives_up_after_max_attempts(monkeypatch):
+    monkeypatch.setattr(fred_client, "_retry_after", lambda response, attempt: 0.01)
+    server, client = serve(max_per_minute=1, window=60)
+    client.get_series("DGS10")
+    with pytest.raises(requests.HTTPError):
+        client.get_series("DGS10")
+    assert server.rejected == fred_client.MAX_ATTEMPTS
+
+
+class Clock:
+    """time.monotonic/time.sleep that only move when something sleeps"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def busiest_minute(times):
+    times = np.array(times)
+    return max(np.searchsorted(times, t + 60, side="left") - i for i, t in enumerate(times))
+
+
+def test_bucket_stays_under_the_limit_in_every_minute(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(fred_client, "time", clock)
+    monkeypatch.setattr(fred_client, "_buckets", {})
+    bucket = bucket_for("test-key", limit=120)
+    times = []
+    for _ in range(500):
+        bucket.acquire()
+        times.append(clock.now)
+    assert busiest_minute(times) <= 120
+    # ...and only waits as long as its design says: a burst of 30, then 90 a minute
+    assert clock.now == pytest.approx((500 - 30) / 90 * 60)
+    assert bucket_for("test-key") is bucket
+
+
+def test_bucket_pause_holds_everyone_back(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(fred_client, "time", clock)
+    bucket = TokenBucket(rate=2, capacity=10)
+    bucket.pause(5)
+    assert bucket.acquire() >= 5
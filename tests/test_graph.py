@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine import DERIVED, YIELD_COLUMNS
+from graph import Node, SeriesGraph
+
+
+def fresh_graph():
+    """The engine's derived series in a graph of their own (DERIVED is shared by the process)"""
+    return SeriesGraph([Node(node.name, node.inputs, node.compute, node.optional) for node in DERIVED.nodes.values()])
+
+
+def make_raw():
+    rng = np.random.default_rng(0)
+    days = pd.bdate_range("2018-01-01", "2024-06-28")
+    months = pd.date_range("2016-01-01", "2024-05-01", freq="MS")
+    market = pd.DataFrame({ticker: 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(days))))
+                           for ticker in ["SPY", "IWM", "UUP"]}, index=days)
+    market["^VIX"] = 20 + np.cumsum(rng.normal(0, 1, len(days))).clip(-15, 30)
+    raw = {"market": market,
+           "CPIAUCSL": pd.Series(240 * np.exp(np.cumsum(rng.normal(0.002, 0.001, len(months)))), index=months)}
+    for i, code in enumerate(YIELD_COLUMNS):
+        raw[code] = pd.Series(1 + i * 0.3 + np.cumsum(rng.normal(0, 0.02, len(days))), index=days, name=code)
+    return raw
+
+
+def evaluate(graph, raw, failing=()):
+    def load(symbol):
+        if symbol in failing:
+            raise RuntimeError(f"{symbol} failed to load")
+        return raw[symbol]
+    return {name: graph.value(name, load) for name in graph.nodes}
+
+
+def assert_same(incremental, full):
+    for name in full:
+        if isinstance(full[name], pd.DataFrame):
+            pd.testing.assert_frame_equal(incremental[name], full[name], check_freq=False, obj=name)
+        else:
+            pd.testing.assert_series_equal(incremental[name], full[name], check_freq=False, obj=name)
+
+
+def with_row(frame, date, values):
+    return pd.concat([frame, pd.DataFrame([values], index=[pd.Timestamp(date)], columns=frame.columns)])
+
+
+@pytest.fixture
+def primed():
+    """A graph that has evaluated everything once, and the raw series it saw"""
+    graph, raw = fresh_graph(), make_raw()
+    evaluate(graph, raw)
+    return graph, raw
+
+
+def test_new_bar(primed):
+    graph, raw = primed
+    raw["market"] = with_row(raw["market"], "2024-07-01", [101.0, 99.0, 28.0, 35.0])
+    for code in YIELD_COLUMNS:
+        raw[code] = pd.concat([raw[code], pd.Series([4.2], index=[pd.Timestamp("2024-07-01")], name=code)])
+
+    assert_same(evaluate(graph, raw), evaluate(fresh_graph(), raw))
+    stats = graph.stats()
+    assert all(stats[name]["incremental"] == 1 for name in ["closes", "real_prices", "vix_regime", "yield_curve"])
+    assert (stats["CPI_YOY"]["incremental"], stats["CPI_YOY"]["full"]) == (0, 1)
+
+
+def test_cpi_revision(primed):
+    graph, raw = primed
+    cpi = raw["CPIAUCSL"].copy()
+    cpi.iloc[-6] *= 1.01
+    raw["CPIAUCSL"] = cpi
+
+    assert_same(evaluate(graph, raw), evaluate(fresh_graph(), raw))
+    assert graph.stats()["real_prices"]["incremental"] == 1
+    assert (graph.stats()["closes"]["incremental"], graph.stats()["closes"]["full"]) == (0, 1)
+
+
+def test_cpi_revision_reaching_the_base_date(primed):
+    graph, raw = primed
+    cpi = raw["CPIAUCSL"].copy()
+    cpi.loc["2018-01-01"] *= 1.02
+    raw["CPIAUCSL"] = cpi
+
+    assert_same(evaluate(graph, raw), evaluate(fresh_graph(), raw))
+    assert graph.stats()["real_prices"]["full"] == 2
+
+
+def test_new_print(primed):
+    graph, raw = primed
+    cpi = raw["CPIAUCSL"]
+    raw["CPIAUCSL"] = pd.concat([cpi, pd.Series([cpi.iloc[-1] * 1.003], index=[pd.Timestamp("2024-06-01")])])
+
+    assert_same(evaluate(graph, raw), evaluate(fresh_graph(), raw))
+    assert graph.stats()["CPI_YOY"]["incremental"] == 1
+
+
+def test_optional_tenor_failing_and_coming_back(primed):
+    graph, raw = primed
+    incremental = evaluate(graph, raw, failing=["DGS20"])
+    assert_same(incremental, evaluate(fresh_graph(), raw, failing=["DGS20"]))
+    assert "20Y" not in incremental["yield_curve"].columns
+
+    assert_same(evaluate(graph, raw), evaluate(fresh_graph(), raw))
+
+
+def test_required_input_failing_raises(primed):
+    graph, raw = primed
+    with pytest.raises(RuntimeError):
+        graph.value("real_prices", lambda symbol: (_ for _ in ()).throw(RuntimeError(symbol)))
+
+
+def test_unchanged_inputs_are_hits(primed):
+    graph, raw = primed
+    before = evaluate(graph, raw)
+    after = evaluate(graph, {name: series.copy() for name, series in raw.items()})
+    assert all(after[name] is before[name] for name in before)
+    assert all(counts["incremental"] == 0 for counts in graph.stats().values())
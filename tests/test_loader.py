@@ -0,0 +1,171 @@
+import threading
+import time
+
+import pytest
+
+from loader import CircuitBreaker, CircuitOpenError, SeriesNotFoundError, SingleFlight, fetch_all
+
+
+def run_concurrently(n, target):
+    """Start n threads running target() and return them once they've all started"""
+    threads = [threading.Thread(target=target) for _ in range(n)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def test_single_flight_runs_one_call_per_key():
+    flight, release = SingleFlight(), threading.Event()
+    calls, results = [], []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return "data"
+
+    threads = run_concurrently(8, lambda: results.append(flight.do("fred:CPIAUCSL", fetch)))
+    wait_for(lambda: flight.shared == 7)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == [1]
+    assert results == ["data"] * 8
+
+
+def test_single_flight_shares_the_exception():
+    flight, release = SingleFlight(), threading.Event()
+    errors = []
+
+    def fetch():
+        release.wait(5)
+        raise ValueError("Bad Request. The series does not exist.")
+
+    def call():
+        try:
+            flight.do("fred:SRFAMOUNT", fetch)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = run_concurrently(4, call)
+    wait_for(lambda: flight.shared == 3)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(errors) == 4 and len({id(e) for e in errors}) == 1
+
+
+def test_single_flight_forgets_finished_calls():
+    flight = SingleFlight()
+    assert flight.do("key", lambda: 1) == 1
+    assert flight.do("key", lambda: 2) == 2
+    with pytest.raises(KeyError):
+        flight.do("key", lambda: {}["missing"])
+    assert flight.do("key", lambda: 3) == 3
+    assert flight.shared == 0
+
+
+def failing():
+    raise ConnectionError("connection refused")
+
+
+def trip(breaker):
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(ConnectionError):
+            breaker.call(failing)
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("fred", failure_threshold=3, reset_after=60)
+    with pytest.raises(ConnectionError):
+        breaker.call(failing)
+    assert breaker.call(lambda: "ok") == "ok"   # a success resets the count
+    trip(breaker)
+    assert breaker.is_open
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "never called")
+
+
+def test_breaker_ignores_errors_that_dont_count():
+    breaker = CircuitBreaker("fred", failure_threshold=2, reset_after=60)
+
+    def missing():
+        raise ValueError("Bad Request. The series does not exist.")
+
+    for _ in range(5):
+        with pytest.raises(ValueError):
+            breaker.call(missing, counts_as_failure=lambda e: not isinstance(e, ValueError))
+    assert not breaker.is_open
+
+
+def test_half_open_admits_one_trial():
+    breaker = CircuitBreaker("fred", failure_threshold=2, reset_after=0.05)
+    trip(breaker)
+    time.sleep(0.06)
+    assert not breaker.is_open
+
+    started, release, results = threading.Event(), threading.Event(), []
+
+    def probe():
+        started.set()
+        release.wait(5)
+        return "ok"
+
+    trial = threading.Thread(target=lambda: results.append(breaker.call(probe)))
+    trial.start()
+    started.wait(5)
+    # Everyone else fails fast while the trial is running
+    assert breaker.is_open
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "not the trial")
+    release.set()
+    trial.join()
+    assert results == ["ok"]
+    assert not breaker.is_open
+    assert breaker.call(lambda: "closed") == "closed"
+
+
+def test_failed_trial_reopens_immediately():
+    breaker = CircuitBreaker("fred", failure_threshold=3, reset_after=0.05)
+    trip(breaker)
+    time.sleep(0.06)
+    with pytest.raises(ConnectionError):
+        breaker.call(failing)
+    assert breaker.is_open
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "still open")
+
+
+def test_trial_that_proves_nothing_frees_the_slot():
+    breaker = CircuitBreaker("fred", failure_threshold=2, reset_after=0.05)
+    trip(breaker)
+    time.sleep(0.06)
+    with pytest.raises(KeyError):
+        breaker.call(lambda: {}["x"], counts_as_failure=lambda e: False)
+    # Still half-open: the next call is another trial
+    assert not breaker.is_open
+    assert breaker.call(lambda: "ok") == "ok"
+
+
+def test_fetch_all_retries_outages_but_not_missing_series():
+    calls = []
+
+    def fetch(spec):
+        calls.append(spec["symbol"])
+        if spec["symbol"] == "SRFAMOUNT":
+            raise SeriesNotFoundError("Bad Request.  The series does not exist.")
+        if spec["symbol"] == "DGS10" and calls.count("DGS10") < 3:
+            raise ConnectionError("connection reset")
+        return spec["symbol"]
+
+    specs = [{"source": "fred", "symbol": "SRFAMOUNT"}, {"source": "fred", "symbol": "DGS10"}]
+    results, errors = fetch_all(specs, fetch, retries=2, backoff=0.01)
+    assert results == {"DGS10": "DGS10"}
+    assert errors == {"SRFAMOUNT": "Bad Request.  The series does not exist."}
+    assert calls.count("SRFAMOUNT") == 1 and calls.count("DGS10") == 3
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rolling import PairCorrelation, SeriesAnalytics
+
+
+def prices(n=600, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.01, n))), index=pd.bdate_range("2020-01-01", periods=n))
+
+
+def assert_close(incremental, full):
+    if isinstance(full, pd.DataFrame):
+        pd.testing.assert_frame_equal(incremental, full, check_freq=False, rtol=1e-6)
+    else:
+        pd.testing.assert_series_equal(incremental, full, check_freq=False, rtol=1e-6)
+
+
+@pytest.mark.parametrize("kind", ["price", "level"])
+def test_extend_matches_a_full_pass(kind):
+    series = prices()
+    analytics = SeriesAnalytics(kind)
+    analytics.extend(series.iloc[:400])
+    # One bar at a time, then a batch
+    for end in range(401, 410):
+        analytics.extend(series.iloc[:end])
+    assert_close(analytics.extend(series), SeriesAnalytics(kind).extend(series))
+
+
+def test_revision_recomputes_from_the_changed_row():
+    series = prices()
+    analytics = SeriesAnalytics("price")
+    analytics.extend(series)
+    revised = series.copy()
+    revised.iloc[-30:] *= 0.9
+    assert_close(analytics.extend(revised), SeriesAnalytics("price").extend(revised))
+
+
+def test_dropped_rows_shorten_the_output():
+    series = prices()
+    analytics = SeriesAnalytics("price")
+    analytics.extend(series)
+    assert_close(analytics.extend(series.iloc[:-5]), SeriesAnalytics("price").extend(series.iloc[:-5]))
+
+
+def test_pair_correlation_extend_matches_a_full_pass():
+    x, y = prices(seed=1), prices(seed=2)
+    y = y.drop(y.index[::7])   # correlation only uses dates both have
+    pair = PairCorrelation(("price", "level"))
+    pair.extend(x.iloc[:500], y.loc[:x.index[499]])
+    for end in range(501, 510):
+        pair.extend(x.iloc[:end], y.loc[:x.index[end - 1]])
+    assert_close(pair.extend(x, y), PairCorrelation(("price", "level")).extend(x, y))
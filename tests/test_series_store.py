@@ -0,0 +1,132 @@
+import pandas as pd
+import pytest
+
+from series_store import SeriesStore, merge_vintages
+
+T = pd.Timestamp
+NOW = pd.NaT
+
+
+def rows(*vintages):
+    """Vintage rows from (date, value, realtime_start, realtime_end) tuples"""
+    frame = pd.DataFrame(vintages, columns=["date", "value", "realtime_start", "realtime_end"])
+    for column in ["date", "realtime_start", "realtime_end"]:
+        frame[column] = pd.to_datetime(frame[column])
+    return frame
+
+
+def periods(vintages, date):
+    """(value, realtime_start, realtime_end) of every vintage of one observation"""
+    picked = vintages[vintages["date"] == T(date)].sort_values("realtime_start")
+    return [(value, start, None if pd.isna(end) else end)
+            for value, start, end in zip(picked["value"], picked["realtime_start"], picked["realtime_end"])]
+
+
+HISTORY = rows(
+    ("2024-01-01", 308.0, "2024-02-13", "2024-02-20"),
+    ("2024-01-01", 308.4, "2024-02-21", NOW),
+)
+SINCE = T("2024-03-01")
+
+
+def test_revision_splits_the_open_period():
+    # FRED clips the period that was open at `since` to start there
+    fresh = rows(
+        ("2024-01-01", 308.4, "2024-03-01", "2024-03-11"),
+        ("2024-01-01", 309.0, "2024-03-12", NOW),
+    )
+    merged = merge_vintages(HISTORY, fresh, SINCE)
+    assert periods(merged, "2024-01-01") == [
+        (308.0, T("2024-02-13"), T("2024-02-20")),
+        (308.4, T("2024-02-21"), T("2024-03-11")),
+        (309.0, T("2024-03-12"), None),
+    ]
+
+
+def test_new_print_leaves_unchanged_values_in_one_period():
+    fresh = rows(
+        ("2024-01-01", 308.4, "2024-03-01", NOW),
+        ("2024-02-01", 310.3, "2024-03-12", NOW),
+    )
+    merged = merge_vintages(HISTORY, fresh, SINCE)
+    assert periods(merged, "2024-01-01") == [
+        (308.0, T("2024-02-13"), T("2024-02-20")),
+        (308.4, T("2024-02-21"), None),
+    ]
+    assert periods(merged, "2024-02-01") == [(310.3, T("2024-03-12"), None)]
+
+
+def test_history_from_since_on_is_replaced():
+    # A stored period starting on or after `since` is superseded by what FRED says now
+    history = pd.concat([HISTORY.iloc[:1], rows(("2024-01-01", 308.4, "2024-02-21", "2024-03-04"),
+                                                ("2024-01-01", 308.9, "2024-03-05", NOW))], ignore_index=True)
+    fresh = rows(("2024-01-01", 308.4, "2024-03-01", NOW))
+    merged = merge_vintages(history, fresh, SINCE)
+    assert periods(merged, "2024-01-01") == [
+        (308.0, T("2024-02-13"), T("2024-02-20")),
+        (308.4, T("2024-02-21"), None),
+    ]
+
+
+def test_as_of(tmp_path):
+    store = SeriesStore(str(tmp_path))
+    vintages = merge_vintages(HISTORY, rows(
+        ("2024-01-01", 308.4, "2024-03-01", "2024-03-11"),
+        ("2024-01-01", 309.0, "2024-03-12", NOW),
+        ("2024-02-01", 310.3, "2024-03-12", NOW),
+    ), SINCE)
+    current = store.get_or_fetch_vintages("fred", "CPIAUCSL", lambda since: vintages, frequency="monthly")
+
+    # The in-memory copy is float32 (see compact.py)
+    assert current["value"].tolist() == pytest.approx([309.0, 310.3])
+    assert store.as_of("fred", "CPIAUCSL", "2024-02-12").empty
+    assert store.as_of("fred", "CPIAUCSL", "2024-02-13").tolist() == [308.0]
+    assert store.as_of("fred", "CPIAUCSL", "2024-03-11").tolist() == [308.4]
+    as_of = store.as_of("fred", "CPIAUCSL", "2024-03-12")
+    assert as_of.tolist() == [309.0, 310.3]
+    assert list(as_of.index) == [T("2024-01-01"), T("2024-02-01")]
+    assert store.as_of("fred", "OTHER", "2024-03-12") is None
+
+
+def closes(scale=1.0, days=30):
+    index = pd.bdate_range("2024-01-01", periods=days)
+    return pd.DataFrame({"SPY": [scale * (400 + i) for i in range(days)]}, index=index)
+
+
+def fetcher(full, calls):
+    def fetch(since):
+        calls.append(since)
+        return full if since is None else full.loc[since:]
+    return fetch
+
+
+def test_matching_tail_is_spliced_on(tmp_path):
+    store, calls = SeriesStore(str(tmp_path)), []
+    store.get_or_fetch("yahoo", "SPY", fetcher(closes(days=29), calls), check_overlap=True)
+    # The last stored bar may have been intraday, so it's allowed to change
+    updated = closes()
+    updated.iloc[-2] += 1.5
+    result = store.get_or_fetch("yahoo", "SPY", fetcher(updated, calls), force=True, check_overlap=True)
+
+    assert calls[0] is None and calls[1] is not None and len(calls) == 2
+    assert result["SPY"].tolist() == pytest.approx(updated["SPY"].tolist())
+
+
+def test_rescaled_tail_downloads_everything_again(tmp_path):
+    store, calls = SeriesStore(str(tmp_path)), []
+    store.get_or_fetch("yahoo", "SPY", fetcher(closes(days=29), calls), check_overlap=True)
+    # e.g. adjusted closes after an ex-dividend date: the whole history moves
+    rescaled = closes(scale=0.995)
+    result = store.get_or_fetch("yahoo", "SPY", fetcher(rescaled, calls), force=True, check_overlap=True)
+
+    assert calls[0] is None and calls[1] is not None and calls[2] is None
+    assert result["SPY"].tolist() == pytest.approx(rescaled["SPY"].tolist())
+    assert store.read("yahoo", "SPY")["SPY"].tolist() == pytest.approx(rescaled["SPY"].tolist())
+
+
+def test_rescale_is_spliced_without_check_overlap(tmp_path):
+    store, calls = SeriesStore(str(tmp_path)), []
+    store.get_or_fetch("yahoo", "SPY", fetcher(closes(days=29), calls))
+    result = store.get_or_fetch("yahoo", "SPY", fetcher(closes(scale=0.995), calls), force=True)
+    assert len(calls) == 2
+    assert result["SPY"].iloc[0] == 400
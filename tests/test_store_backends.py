@@ -0,0 +1,127 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from bench.stand_ins import FakeRedis
+from series_store import SeriesStore
+from store_backends import FileBackend, RedisBackend, backend_for
+
+
+@pytest.fixture(params=["file", "redis"])
+def backend(request, tmp_path):
+    if request.param == "file":
+        return FileBackend(tmp_path)
+    return RedisBackend(FakeRedis(), name=f"fake-{tmp_path.name}")
+
+
+def frame(days=10, start=400.0):
+    return pd.DataFrame({"value": [start + i for i in range(days)]}, index=pd.bdate_range("2024-01-01", periods=days))
+
+
+def test_blobs_round_trip(backend):
+    assert backend.read("missing.parquet") is None
+    backend.write("a.json", b"{}")
+    backend.write("a.json", b'{"rows": 1}')
+    assert backend.read("a.json") == b'{"rows": 1}'
+
+
+def test_store_write_read_and_get_or_fetch(backend):
+    store = SeriesStore(backend)
+    store.write("fred", "DGS10", frame())
+    assert store.read("fred", "DGS10")["value"].tolist() == frame()["value"].tolist()
+    assert store.meta("fred", "DGS10")["rows"] == 10
+
+    calls = []
+
+    def fetch(since):
+        calls.append(since)
+        return frame(12)
+    # Fresh: served from the store
+    store.get_or_fetch("fred", "DGS10", fetch)
+    assert calls == []
+    # Forced: only the tail is asked for and merged in
+    result = store.get_or_fetch("fred", "DGS10", fetch, force=True)
+    assert calls == [pd.Timestamp("2024-01-12") - pd.Timedelta(days=7)]
+    assert result["value"].tolist() == frame(12)["value"].tolist()
+
+
+def test_lock_is_exclusive(backend):
+    held, release, second = threading.Event(), threading.Event(), []
+
+    def holder():
+        with backend.lock("DGS10") as acquired:
+            assert acquired
+            held.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=holder)
+    thread.start()
+    held.wait(5)
+    with backend.lock("DGS10", timeout=0.2) as acquired:
+        second.append(acquired)
+    # A different name isn't blocked
+    with backend.lock("DGS2", timeout=0.2) as acquired:
+        second.append(acquired)
+    release.set()
+    thread.join()
+    assert second == [False, True]
+    with backend.lock("DGS10", timeout=0.2) as acquired:
+        assert acquired
+
+
+def test_redis_lock_expires_if_the_holder_dies():
+    client = FakeRedis()
+    backend = RedisBackend(client)
+    # A replica that took the lock and never released it
+    client.set("macro:DGS10:lock", "dead", nx=True, px=100)
+    with backend.lock("DGS10", timeout=0.05) as acquired:
+        assert not acquired
+    time.sleep(0.1)
+    with backend.lock("DGS10", timeout=0.05) as acquired:
+        assert acquired
+
+
+def test_redis_lock_release_leaves_a_newer_holder_alone():
+    client = FakeRedis()
+    backend = RedisBackend(client)
+    with backend.lock("DGS10", timeout=0.05) as acquired:
+        assert acquired
+        # Our lock expired mid-fetch and another replica took it
+        client.delete("macro:DGS10:lock")
+        client.set("macro:DGS10:lock", "other", nx=True, px=60000)
+    assert client.get("macro:DGS10:lock") == b"other"
+
+
+def test_waiter_serves_the_holders_fresh_copy(backend):
+    store = SeriesStore(backend)
+    store.write("fred", "DGS10", frame())
+    started, release, calls, results = threading.Event(), threading.Event(), [], []
+
+    def slow_fetch(since):
+        calls.append(since)
+        started.set()
+        release.wait(5)
+        return frame(12)
+
+    def refresh():
+        results.append(store.get_or_fetch("fred", "DGS10", slow_fetch, force=True))
+
+    first = threading.Thread(target=refresh)
+    first.start()
+    started.wait(5)
+    second = threading.Thread(target=refresh)
+    second.start()
+    time.sleep(0.1)   # let it block on the lock
+    release.set()
+    first.join()
+    second.join()
+    assert len(calls) == 1
+    assert [len(result) for result in results] == [12, 12]
+
+
+def test_backend_for(tmp_path):
+    assert isinstance(backend_for(tmp_path), FileBackend)
+    redis = RedisBackend(FakeRedis())
+    assert backend_for(redis) is redis
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from transforms import ffill_within, normalize
+
+NAN = np.nan
+
+
+def test_rebase_starts_each_column_at_100():
+    values = np.array([[NAN, 2.0], [4.0, 3.0], [5.0, 4.0]])
+    np.testing.assert_allclose(normalize(values, "rebase"), [[NAN, 100], [100, 150], [125, 200]])
+
+
+@pytest.mark.parametrize("base", [0.0, np.inf])
+def test_rebase_on_an_unusable_base_is_undefined(base):
+    # e.g. temporary repo, which has sat at 0 since 2022
+    values = np.array([[base, 2.0], [0.0, 3.0], [1.5, 4.0]])
+    with np.errstate(all="raise"):
+        rebased = normalize(values, "rebase")
+    assert np.isnan(rebased[:, 0]).all()
+    np.testing.assert_allclose(rebased[:, 1], [100, 150, 200])
+
+
+def test_change_from_a_zero_base():
+    values = np.array([[0.0], [0.0], [1.5]])
+    np.testing.assert_allclose(normalize(values, "change"), [[0.0], [0.0], [1.5]])
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        normalize(np.ones((2, 2)), "log")
+
+
+def test_ffill_within_stops_at_the_last_observation():
+    values = np.array([[1.0, NAN], [NAN, 2.0], [3.0, NAN], [NAN, NAN]])
+    np.testing.assert_allclose(ffill_within(values), [[1, NAN], [1, 2], [3, NAN], [NAN, NAN]])
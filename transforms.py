@@ -0,0 +1,198 @@
+"""Vectorized calculations shared by the dashboard views.
+
+Everything here is plain pandas/NumPy on already-loaded data (no fetching,
+no Streamlit), so results can be cached and reused across views.
+"""
+import numpy as np
+import pandas as pd
+
+# Common curve spreads as (label, short tenor, long tenor)
+CURVE_SPREADS = [
+    ("2s10s", "2Y", "10Y"),
+    ("3m10y", "3M", "10Y"),
+]
+
+
+def build_yield_curve(series_by_tenor):
+    """Align yield series into one date x tenor frame (columns in the given tenor order)"""
+    curve = pd.concat(series_by_tenor, axis=1)
+    curve = curve.dropna(how="all").sort_index()
+    return curve[list(series_by_tenor)]
+
+
+def real_yields(curve, cpi_inflation):
+    """Real yield for every tenor at once: nominal minus YoY CPI inflation.
+
+    Only dates with a CPI observation get a value (other rows are NaN), matching
+    the per-tenor index intersection the charts used before.
+    """
+    inflation = cpi_inflation.reindex(curve.index)
+    return curve.sub(inflation, axis=0)
+
+
+def curve_spreads(curve, spreads=CURVE_SPREADS):
+    """Long minus short yield for each spread whose tenors are on the curve"""
+    columns = {
+        label: curve[long] - curve[short]
+        for label, short, long in spreads
+        if short in curve.columns and long in curve.columns
+    }
+    return pd.DataFrame(columns, index=curve.index)
+
+
+def curve_snapshot(curve, date):
+    """The curve on the last date at or before `date` that has any observation"""
+    history = curve.loc[:date].dropna(how="all")
+    if history.empty:
+        return pd.Series(dtype=float)
+    return history.iloc[-1]
+
+
+def _as_int64(index):
+    """Dates as int64 nanoseconds, whatever resolution the index is stored at"""
+    return np.asarray(index, dtype="datetime64[ns]").astype(np.int64)
+
+
+def cpi_version(cpi):
+    """Fingerprint of a CPI history; changes with every new release or revision"""
+    if len(cpi) == 0:
+        return None
+    return len(cpi), str(cpi.index[-1]), int(pd.util.hash_pandas_object(cpi, index=True).sum())
+
+
+class CpiDeflator:
+    """Daily price level derived once from monthly CPI levels, for deflating any daily series.
+
+    Each monthly print is anchored on the date FRED gives it (the 1st of the
+    month) and consecutive prints are joined geometrically, i.e. linearly in
+    log level over calendar days, so the level compounds smoothly through the
+    month rather than jumping. After the latest print the level is held flat
+    until the next release; before the first print it is NaN.
+    """
+
+    def __init__(self, cpi):
+        cpi = cpi.dropna().sort_index()
+        self.version = cpi_version(cpi)
+        self._dates = _as_int64(cpi.index)
+        self._log_level = np.log(cpi.to_numpy(dtype=float))
+
+    def level(self, index):
+        """CPI level on each date of index, as a NumPy array"""
+        dates = _as_int64(index)
+        level = np.exp(np.interp(dates, self._dates, self._log_level))
+        if len(self._dates):
+            level[dates < self._dates[0]] = np.nan
+        return level
+
+    def revision_start(self, date):
+        """First date whose level can move when the print at `date` (or a later one) is revised.
+
+        That's the print before it, since levels in between are interpolated;
+        None if the revision reaches back to the first print.
+        """
+        i = np.searchsorted(self._dates, _as_int64(pd.DatetimeIndex([date]))[0]) - 1
+        return pd.Timestamp(self._dates[i]) if i >= 0 else None
+
+    def base_dates(self, prices):
+        """Each column's first date with both a price and a CPI level (one date for a Series)"""
+        values = prices.to_numpy(dtype=float)
+        has_level = _as_int64(prices.index) >= (self._dates[0] if len(self._dates) else np.iinfo(np.int64).max)
+        valid = ~np.isnan(values) & (has_level[:, None] if values.ndim == 2 else has_level)
+        return prices.index[np.argmax(valid, axis=0)]
+
+    def deflate(self, prices, base_date=None, since=None):
+        """Real prices (Series or DataFrame) with one divide by the aligned price level.
+
+        Values are in dollars of base_date (one date, or one per column), by
+        default of each column's first price, so a real line starts where its
+        nominal line does. since limits the result to dates from `since` on,
+        for updating an earlier result after a CPI revision.
+        """
+        if base_date is None:
+            base_date = self.base_dates(prices)
+        base = self.level(pd.DatetimeIndex(np.atleast_1d(base_date)))
+        if since is not None:
+            prices = prices.loc[since:]
+        values = prices.to_numpy(dtype=float)
+        level = self.level(prices.index)
+        if values.ndim == 2:
+            level = level[:, None]
+        else:
+            base = base[0]
+        real = values / level * base
+
+        if isinstance(prices, pd.Series):
+            return pd.Series(real, index=prices.index, name=prices.name)
+        return pd.DataFrame(real, index=prices.index, columns=prices.columns)
+
+
+def first_difference(old, new):
+    """Earliest date where two versions of a Series or DataFrame differ, or None if they're equal.
+
+    Added, removed and revised rows all count; different columns count as a
+    difference at the very first date.
+    """
+    if old is new:
+        return None
+    if isinstance(old, pd.DataFrame) != isinstance(new, pd.DataFrame) or (
+            isinstance(new, pd.DataFrame) and not old.columns.equals(new.columns)):
+        return min(old.index[:1].append(new.index[:1]), default=None)
+    n = min(len(old), len(new))
+    a, b = old.to_numpy(dtype=float)[:n], new.to_numpy(dtype=float)[:n]
+    same = (a == b) | (np.isnan(a) & np.isnan(b))
+    if same.ndim == 2:
+        same = same.all(axis=1)
+    same &= np.asarray(old.index[:n] == new.index[:n])
+    if not same.all():
+        i = int(np.argmin(same))
+        return min(old.index[i], new.index[i])
+    if len(old) != len(new):
+        return (old if len(old) > n else new).index[n]
+    return None
+
+
+# Ways to put series with different units on one chart (see normalize)
+NORMALIZATIONS = ["level", "rebase", "change", "zscore"]
+
+
+def ffill_within(values):
+    """Forward-fill each column of a 2-D array over its gaps, but not past its last observation.
+
+    Lets a monthly or weekly series line up with daily ones on a shared
+    calendar without inventing values after it was last published.
+    """
+    n = len(values)
+    valid = ~np.isnan(values)
+    rows = np.arange(n)[:, None]
+    # Row of the latest observation at or before each row (0 before the first, which is NaN anyway)
+    latest = np.maximum.accumulate(np.where(valid, rows, 0), axis=0)
+    filled = np.take_along_axis(values, latest, axis=0)
+    last = n - 1 - np.argmax(valid[::-1], axis=0)
+    filled[rows > last] = np.nan
+    return filled
+
+
+def normalize(values, mode):
+    """Rescale each column of a 2-D array so columns with different units can share an axis.
+
+    rebase: first value in the window = 100; change: difference from the first
+    value; zscore: standard deviations from the window's mean; level: as-is.
+    A column whose first value is zero (or infinite) can't be rebased and comes
+    back all NaN.
+    """
+    if mode == "level":
+        return values
+    if mode not in NORMALIZATIONS:
+        raise ValueError(f"unknown normalization {mode!r} (expected one of {', '.join(NORMALIZATIONS)})")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if mode == "zscore":
+            counts = (~np.isnan(values)).sum(axis=0)
+            mean = np.nansum(values, axis=0) / counts
+            std = np.sqrt(np.nansum((values - mean) ** 2, axis=0) / (counts - 1))
+            return (values - mean) / std
+        first = values[np.argmax(~np.isnan(values), axis=0), np.arange(values.shape[1])]
+        if mode == "change":
+            return values - first
+        # e.g. temporary repo, which has sat at 0 since 2022
+        first = np.where(np.isfinite(first) & (first != 0), first, np.nan)
+        return values / first * 100